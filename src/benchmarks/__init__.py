@@ -0,0 +1,265 @@
+'''
+Benchmarks
+==========
+Timing of the decompositions and solvers across matrix sizes and
+matrix classes. For every (method, matrix class, size) the suite
+measures the best wall time of several runs, the number of iterations
+of iterative methods, the peak memory of one run (with `tracemalloc`)
+and the relative residual `|A*x - b| / |b|`. Complexity exponents p of
+`time ~ n^p` are fitted by least squares on the log-log scale.
+
+Results are plain JSON, a stored result can be used as a baseline: runs
+that became slower (or need more memory or iterations) than the
+baseline by more than the threshold are reported as regressions.
+Run `python -m benchmarks --help` from `src` for the command line.
+'''
+
+import json
+import platform
+import random
+import time
+import tracemalloc
+from math import log
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from methods.FixedPointIteration import IterationSolve
+from methods.LU import LU, SolveLU
+from methods.QR import QR, QRSolve
+from methods.Seildel import SeidelSolve
+from methods.backend import getBackend
+from methods.convergence import ConvergenceException, StoppingCriteria
+from methods.matrix import Matrix, residualNorm
+from methods.vector import Vector
+from testMatrix import generateTest5
+
+System = Tuple[Matrix, Vector]
+
+
+def randomMatrix(n: int, rng: random.Random) -> System:
+    '''
+    Dense matrix with elements uniformly distributed in [-1, 1]
+    '''
+    A = Matrix([[rng.uniform(-1, 1) for _ in range(n)] for _ in range(n)])
+    return A, Vector.fromIterable([rng.uniform(-1, 1) for _ in range(n)])
+
+def dominantMatrix(n: int, rng: random.Random) -> System:
+    '''
+    Random matrix with `n` added to the diagonal (strictly diagonally dominant)
+    '''
+    A, b = randomMatrix(n, rng)
+    for i in range(n):
+        A[i, i] += n
+    return A, b
+
+def spdMatrix(n: int, rng: random.Random) -> System:
+    '''
+    Symmetric positive definite matrix `R.T*R/n + I` for a random R
+    '''
+    R, b = randomMatrix(n, rng)
+    A = R.T * R * (1 / n)
+    for i in range(n):
+        A[i, i] += 1
+    return A, b
+
+def illMatrix(n: int, rng: random.Random) -> System:
+    '''
+    Ill-conditioned system of `generateTest5` with eps = 1e-3
+    '''
+    test = generateTest5(n, 1e-3)
+    return test.A, Vector.fromIterable(test.b)
+
+matrices: Dict[str, Callable[[int, random.Random], System]] = {
+    'random': randomMatrix,
+    'dominant': dominantMatrix,
+    'spd': spdMatrix,
+    'ill': illMatrix,
+}
+
+def _decomposition(f: Callable) -> Callable:
+    def decompose(A: Matrix, b: Vector, eps: float, criteria: StoppingCriteria):
+        f(A)
+        return None, None
+    return decompose
+
+# name -> function (A, b, eps, criteria) returning solution (None for decompositions) and iterations
+methods: Dict[str, Callable] = {
+    'LU': _decomposition(LU),
+    'QR': _decomposition(QR),
+    'SolveLU': lambda A, b, eps, criteria: (SolveLU(A, b), None),
+    'QRSolve': lambda A, b, eps, criteria: (QRSolve(A, b), None),
+    'SeidelSolve': lambda A, b, eps, criteria: SeidelSolve(A, b, eps, criteria=criteria),
+    'IterationSolve': lambda A, b, eps, criteria: IterationSolve(A, b, eps, criteria),
+}
+
+
+def measure(method: str, A: Matrix, b: Vector, eps: float = 1e-6, repeat: int = 3,
+            criteria: Optional[StoppingCriteria] = None) -> dict:
+    '''
+    Runs the method on the system `repeat` times and once more under `tracemalloc`
+
+    returns dictionary with the best wall time in seconds ('time'), 'iterations',
+    peak traced memory in bytes ('peakMemory'), relative residual ('residual')
+    and 'status' ('ok', the reason of failure of an iterative method or the name of a raised exception)
+    '''
+    f = methods[method]
+    best = float('inf')
+    x = k = None
+    status = 'ok'
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            x, k = f(A, b, eps, criteria)
+        except ConvergenceException as e:
+            x, k, status = e.x, e.k, e.status
+        except Exception as e:
+            x, k, status = None, None, type(e).__name__
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        try:
+            f(A, b, eps, criteria)
+        except Exception:
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'time': best,
+        'iterations': k,
+        'peakMemory': peak,
+        'residual': None if x is None else residualNorm(A, x, b) / b.abs(),
+        'status': status,
+    }
+
+def fitExponent(sizes: Iterable[int], times: Iterable[float], minTime: float = 1e-4) -> Optional[float]:
+    '''
+    Exponent p of `time ~ C * n^p` fitted by least squares on `log(time) = log(C) + p*log(n)`.
+    Times below `minTime` are dominated by overheads and are skipped
+
+    returns None if less than two points are left
+    '''
+    points = [(log(n), log(t)) for n, t in zip(sizes, times) if t >= minTime]
+    if len(points) < 2:
+        return None
+    mx = sum(p[0] for p in points) / len(points)
+    my = sum(p[1] for p in points) / len(points)
+    sxx = sum((px - mx) ** 2 for px, _ in points)
+    if sxx == 0:
+        return None
+    return sum((px - mx) * (py - my) for px, py in points) / sxx
+
+def run(methodNames: Iterable[str] = tuple(methods), matrixNames: Iterable[str] = tuple(matrices),
+        sizes: Iterable[int] = (10, 20, 50, 100, 200), eps: float = 1e-6, repeat: int = 3,
+        maxIter: int = 10000, maxTime: float = 10., seed: int = 0,
+        progress: Optional[Callable[[str], None]] = None) -> dict:
+    '''
+    Runs the benchmark suite
+
+    params
+    ------
+    methodNames: Iterable[str]
+        names of methods from `methods`
+    matrixNames: Iterable[str]
+        names of matrix classes from `matrices`
+    sizes: Iterable[int]
+        sizes of systems
+    eps: float
+        required error of the iterative methods
+    repeat: int
+        number of timed runs, the best time is reported
+    maxIter: int
+        iteration limit of the iterative methods
+    maxTime: float
+        once a run of a method takes longer than it (in seconds), greater
+        sizes of the same matrix class are skipped for this method
+    seed: int
+        seed of random matrices
+    progress: Callable[[str], None] | None
+        function receiving a line about every finished run
+
+    returns dictionary with 'meta' (environment), 'results' (list of measurements)
+    and 'exponents' (method -> matrix class -> exponent fitted on successful runs)
+    '''
+    methodNames, matrixNames, sizes = list(methodNames), list(matrixNames), sorted(sizes)
+    criteria = StoppingCriteria(maxIter=maxIter)
+    results = []
+    exponents: Dict[str, Dict[str, Optional[float]]] = {m: {} for m in methodNames}
+    for kind in matrixNames:
+        slow = set()
+        points: Dict[str, List[Tuple[int, float]]] = {m: [] for m in methodNames}
+        for n in sizes:
+            A, b = matrices[kind](n, random.Random(seed + n))
+            for method in methodNames:
+                if method in slow:
+                    continue
+                r = {'method': method, 'matrix': kind, 'n': n}
+                r.update(measure(method, A, b, eps, repeat, criteria))
+                results.append(r)
+                if r['status'] == 'ok':
+                    points[method].append((n, r['time']))
+                if r['time'] > maxTime:
+                    slow.add(method)
+                if progress is not None:
+                    progress(f"{method:>15} {kind:>9} n={n:<5} {r['time']:.4g}s iterations={r['iterations']} "
+                        f"peak={r['peakMemory']}B residual={r['residual']} {r['status']}")
+        for method, p in points.items():
+            exponents[method][kind] = fitExponent(*zip(*p)) if p else None
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': type(getBackend()).__name__,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'eps': eps,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+        'exponents': exponents,
+    }
+
+def compare(results: dict, baseline: dict, threshold: float = 1.25, minTime: float = 1e-3) -> List[dict]:
+    '''
+    Finds regressions of the results against the baseline. Runs are matched
+    by method, matrix class and size
+
+    params
+    ------
+    results: dict
+        output of `run`
+    baseline: dict
+        stored output of `run`
+    threshold: float
+        allowed ratio of a new value to the baseline one
+    minTime: float
+        times below it (in both runs) are too noisy and are not compared
+
+    returns list of regressions: dictionaries with 'method', 'matrix', 'n',
+    'metric' ('time', 'peakMemory', 'iterations' or 'status'), 'baseline', 'value' and 'ratio'
+    '''
+    old = {(r['method'], r['matrix'], r['n']): r for r in baseline['results']}
+    regressions = []
+    for r in results['results']:
+        b = old.get((r['method'], r['matrix'], r['n']))
+        if b is None:
+            continue
+        key = {'method': r['method'], 'matrix': r['matrix'], 'n': r['n']}
+        if b['status'] == 'ok' and r['status'] != 'ok':
+            regressions.append(dict(key, metric='status', baseline=b['status'], value=r['status'], ratio=None))
+        for metric in ('time', 'peakMemory', 'iterations'):
+            before, after = b.get(metric), r.get(metric)
+            if not before or after is None:
+                continue
+            if metric == 'time' and max(before, after) < minTime:
+                continue
+            if after > before * threshold:
+                regressions.append(dict(key, metric=metric, baseline=before, value=after, ratio=after / before))
+    return regressions
+
+def save(results: dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
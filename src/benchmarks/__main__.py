@@ -0,0 +1,65 @@
+'''
+Command line of the benchmark suite, run from `src`:
+
+    python -m benchmarks --sizes 10 20 50 100 --out results.json
+    python -m benchmarks --baseline results.json --threshold 1.2
+
+Exit code is 1 if regressions against the baseline are found
+'''
+
+import argparse
+import json
+import sys
+
+from methods.backend import setBackend
+
+from . import compare, load, matrices, methods, run, save
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks of the linear system solvers')
+    parser.add_argument('--methods', nargs='+', default=list(methods), choices=list(methods))
+    parser.add_argument('--matrices', nargs='+', default=list(matrices), choices=list(matrices))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 20, 50, 100, 200])
+    parser.add_argument('--eps', type=float, default=1e-6, help='required error of the iterative methods')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs')
+    parser.add_argument('--max-iter', type=int, default=10000, help='iteration limit of the iterative methods')
+    parser.add_argument('--max-time', type=float, default=10.,
+                        help='seconds of a run after which greater sizes of the method are skipped')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', choices=['python', 'numpy'], help='arithmetic backend')
+    parser.add_argument('--out', help='file to write results to (printed if not given)')
+    parser.add_argument('--baseline', help='stored results to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25, help='allowed ratio to the baseline')
+    parser.add_argument('--quiet', action='store_true', help='do not print progress')
+    args = parser.parse_args(argv)
+    if args.backend:
+        setBackend(args.backend)
+
+    progress = None if args.quiet else lambda line: print(line, file=sys.stderr)
+    results = run(args.methods, args.matrices, args.sizes, args.eps, args.repeat, args.max_iter,
+                  args.max_time, args.seed, progress)
+    if args.out:
+        save(results, args.out)
+    elif not args.baseline:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    print('fitted exponents of time ~ n^p:', file=sys.stderr)
+    for method, exponents in results['exponents'].items():
+        fitted = ', '.join(f'{kind} {"-" if p is None else f"{p:.2f}"}' for kind, p in exponents.items())
+        print(f'{method:>15}: {fitted}', file=sys.stderr)
+
+    if not args.baseline:
+        return 0
+    regressions = compare(results, load(args.baseline), args.threshold)
+    for r in regressions:
+        ratio = '' if r['ratio'] is None else f' (x{r["ratio"]:.2f})'
+        print(f"REGRESSION {r['method']} {r['matrix']} n={r['n']} {r['metric']}: "
+              f"{r['baseline']} -> {r['value']}{ratio}", file=sys.stderr)
+    print(f'{len(regressions)} regressions against {args.baseline}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
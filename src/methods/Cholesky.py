@@ -0,0 +1,165 @@
+from array import array
+from typing import Hashable, List, Optional, Union
+
+from .backend import getBackend
+from .cache import FactorizationCache
+from .matrix import Matrix, ShapeException, zeros
+from .stats import count, timed
+from .utility import BotDiagSolve, Factorization
+from .vector import Vector
+
+
+class LowerTriangular:
+    '''
+    Lower triangular matrix storing only its lower triangle:
+    row i holds `i+1` elements starting at `data[i*(i+1)/2]`,
+    that is n(n+1)/2 elements instead of n^2. It has `row` and `__len__`
+    like `Matrix`, so `BotDiagSolve` takes it directly
+    '''
+    __slots__ = ('data', 'size')
+
+    def __init__(self, data: array, n: int):
+        '''
+        params
+        ------
+        data: array('d')
+            packed rows of the lower triangle, `n*(n+1)/2` elements
+        n: int
+            size of matrix
+        '''
+        assert len(data) == n * (n + 1) // 2, ShapeException(len(data), n * (n + 1) // 2)
+        self.data = data
+        self.size = n
+
+    def row(self, i: int) -> array:
+        '''
+        Buffer with the copy of elements of i'th row up to the diagonal
+        '''
+        s = i * (i + 1) // 2
+        return self.data[s:s+i+1]
+
+    def toMatrix(self) -> Matrix:
+        '''
+        Dense copy of the matrix
+        '''
+        n = self.size
+        m = zeros(n)
+        for i in range(n):
+            m.data[i*n:i*n+i+1] = array('d', self.row(i))
+        return m
+
+    @timed('triangular solve')
+    def solveTransposed(self, b: Union[Vector, List[float]]) -> Vector:
+        '''
+        Solution of the system `L.T*x = b` by the Gauss method. The rows
+        of L are the columns of L.T, so the column oriented back substitution is used
+
+        params
+        ------
+        b: Vector | List[float]
+            free vector of system
+
+        returns the solution vector
+        '''
+        n = self.size
+        assert n == len(b), ShapeException(n, len(b))
+        y = array('d', b)
+        for j in range(n - 1, -1, -1):
+            row = self.row(j)
+            xj = y[j] / row[j]
+            y[j] = xj
+            if xj:
+                y[:j] = array('d', [a - xj * l for a, l in zip(y[:j], row)])
+        count('flops', n * n)
+        return Vector.fromBuffer(y)
+
+    def __len__(self):
+        return self.size
+
+
+def Cholesky(A: Matrix) -> LowerTriangular:
+    '''
+    Cholesky decomposition of a symmetric positive definite matrix
+    `A = L*L.T`. It takes n^3/6 multiplications, half of the LU decomposition,
+    and only the lower triangle of A is read.
+    Learn more -> https://en.wikipedia.org/wiki/Cholesky_decomposition
+
+    params
+    ------
+    A: Matrix
+        symmetric positive definite matrix
+
+    raises `ValueError` if the matrix is not positive definite
+
+    returns lower triangular matrix L
+    '''
+    n = len(A)
+    return LowerTriangular(getBackend().cholesky(A.data, n), n)
+
+
+class CholeskyFactorization(Factorization):
+    '''
+    Cholesky decomposition of a symmetric positive definite system matrix.
+    The matrix is decomposed once, after that every right-hand side is
+    solved by two triangular solutions in O(n^2)
+
+    attributes
+    ----------
+    L: LowerTriangular
+        the factor, `L*L.T = A`
+    '''
+    @timed('factorization')
+    def __init__(self, A: Matrix):
+        '''
+        params
+        ------
+        A: Matrix
+            symmetric positive definite matrix of system
+        '''
+        self.L = Cholesky(A)
+
+    def __len__(self):
+        return len(self.L)
+
+    def solve(self, b: Union[Vector, List[float]]) -> Vector:
+        '''
+        Solves the system `A*x = b` with the stored decomposition
+
+        params
+        ------
+        b: Vector | List[float]
+            free vector of system
+
+        returns solution vector
+        '''
+        assert len(self) == len(b), ShapeException(len(self), len(b))
+        y = BotDiagSolve(self.L, b)
+        return self.L.solveTransposed(y)
+
+
+def CholeskySolve(A: Matrix, b: Union[Vector, List[float]], cache: Optional[FactorizationCache] = None,
+                  key: Hashable = None):
+    '''
+    Solves the system `A*x = b` with a symmetric positive definite matrix:
+    `L*y = b` -> we get y. `L.T*x = y` -> we get x.
+    Time complexity - O(n^3) with half the work and memory of `SolveLU`,
+    O(n^2) if the decomposition of A is taken from cache
+
+    params
+    ------
+    A: Matrix
+        symmetric positive definite matrix of system
+    b: Vector | List[float]
+        free vector of system
+    cache: FactorizationCache | None
+        cache of decompositions to take the decomposition from (or store it in)
+    key: Hashable | None
+        explicit cache key of A, by default the fingerprint of A is used
+
+    raises `ValueError` if the matrix is not positive definite
+
+    returns solution vector
+    '''
+    assert len(A) == len(b), ShapeException(len(A), len(b))
+    f = CholeskyFactorization(A) if cache is None else cache.get(A, CholeskyFactorization, key)
+    return f.solve(b)
@@ -1,22 +1,155 @@
-from typing import List
+from typing import Callable, List, Optional, Tuple
 
 from .vector import Vector
-from .matrix import Matrix, eye
+from .matrix import Matrix, eye, gemv, isPositiveDefinite, isSymmetric
+from .convergence import Monitor, StoppingCriteria
+from .preconditioner import Preconditioner, makePreconditioner
+from .sparse import SparseMatrix, sparseEye
+from .banded import BandedMatrix, bandedEye
+from .stats import phase
 
 
-def IterationSolve(A: Matrix, b: List[float], eps: float):
+def spectralBounds(A: Matrix, iterations: int = 100, tol: float = 1e-6,
+                   preconditioner: Optional[Preconditioner] = None) -> Tuple[float, float]:
     '''
-    Fixed point iterative method for solving systems of algebraic 
-    linear equations. Learn more -> https://en.wikipedia.org/wiki/Fixed-point_iteration
+    Estimates the least and the greatest eigenvalues of a symmetric
+    positive definite matrix by the power iteration: first on A, then
+    on the shifted matrix `lmax*I - A`. The greatest eigenvalue is
+    increased by 5% to be sure it is not underestimated
 
     params
     ------
     A: Matrix
+        symmetric positive definite matrix
+    iterations: int
+        maximum number of power iterations for each eigenvalue
+    tol: float
+        relative change of the estimate to stop the power iteration
+    preconditioner: Preconditioner | None
+        if given, eigenvalues of `M^-1 * A` are estimated
+
+    returns
+    -------
+    lmin: float
+        estimate of the least eigenvalue
+    lmax: float
+        estimate of the greatest eigenvalue
+    '''
+    def power(shift: float) -> float:
+        v = Vector.fromIterable([1 / (i + 1) for i in range(n)])
+        v = v / v.abs()
+        lam = 0.
+        for _ in range(iterations):
+            w = A * v
+            if preconditioner is not None:
+                w = preconditioner(w)
+            if shift:
+                w = v * shift - w
+            new = sum(v * w)
+            norm = w.abs()
+            if norm == 0:
+                return 0.
+            v = w / norm
+            if abs(new - lam) <= tol * abs(new):
+                return new
+            lam = new
+        return lam
+
+    n = len(A)
+    lmax = power(0.) * 1.05
+    lmin = lmax - power(lmax)
+    return max(lmin, 0.), lmax
+
+def _identity(A: Matrix):
+    '''
+    Unit matrix of the same kind (dense, sparse or band) as A
+    '''
+    if isinstance(A, SparseMatrix):
+        return sparseEye(len(A))
+    if isinstance(A, BandedMatrix):
+        return bandedEye(len(A))
+    return eye(len(A))
+
+def _spd(A: Matrix, b: Vector) -> Tuple[Matrix, Vector]:
+    '''
+    The system itself if its matrix is symmetric positive definite, the normal equations otherwise
+    '''
+    if isSymmetric(A) and isPositiveDefinite(A):
+        return A, b
+    with phase('normal equations'):
+        return A.T * A, A.T * b
+
+def _chebyshev(A: Matrix, b: Vector, lmin: float, lmax: float, monitor: Monitor,
+               M: Optional[Preconditioner] = None):
+    '''
+    Chebyshev iteration for a spectrum (of `M^-1 * A` if preconditioned) inside `[lmin, lmax]`.
+    Learn more -> https://en.wikipedia.org/wiki/Chebyshev_iteration
+    '''
+    d = (lmax + lmin) / 2
+    c = (lmax - lmin) / 2
+    x = (b if M is None else M(b)) / d
+    r = gemv(-1., A, x, 1., b)
+    p = r
+    alpha = 0.
+    k = 0
+    dx = None
+    while not monitor.done(k, x, dx):
+        k += 1
+        z = r if M is None else M(r)
+        if k == 1:
+            p = z.copy()
+            alpha = 1 / d
+        else:
+            beta = (c * alpha) ** 2 / 2 if k == 2 else (c * alpha / 2) ** 2
+            alpha = 1 / (d - beta / alpha)
+            p *= beta
+            p += z
+        x.axpy(alpha, p)
+        gemv(-alpha, A, p, 1., r, out=r)
+        if monitor.needsUpdate:
+            dx = abs(alpha) * p.abs()
+    return x, k
+
+def IterationSolve(A: Matrix, b: List[float], eps: float, criteria: Optional[StoppingCriteria] = None,
+                   step: str = 'norm', preconditioner=None,
+                   onIteration: Optional[Callable[[int, Vector, Optional[float]], None]] = None):
+    '''
+    Fixed point iterative method for solving systems of algebraic
+    linear equations. Learn more -> https://en.wikipedia.org/wiki/Fixed-point_iteration
+
+    The system is rewritten as `x = x - mu*(A*x - b)`. The step mu is chosen by `step`:
+
+    'norm' - `mu = 1/|A|` for the first matrix norm giving a contraction (conservative)
+    'optimal' - `mu = 2/(lmin + lmax)` with eigenvalue estimates from `spectralBounds`
+    'chebyshev' - Chebyshev acceleration with the same eigenvalue estimates
+
+    For 'optimal' and 'chebyshev' a matrix that is not symmetric positive
+    definite is replaced with the normal equations `A.T*A*x = A.T*b`
+
+    With a preconditioner M the iterations are `x = x + mu*M^-1*(b - A*x)`,
+    for 'norm' step `mu = 1` (e.g. the Jacobi method for the Jacobi preconditioner),
+    the other steps use eigenvalues of `M^-1 * A`
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
         Matrix of the system
     b: Vactor | List[float]
         Free vector of the system
     eps: float
         Required methodological error of the solution
+    criteria: StoppingCriteria | None
+        iteration limit and other stopping settings
+    step: str
+        'norm', 'optimal' or 'chebyshev'
+    preconditioner: None | str | Preconditioner | Callable[[Vector], Vector]
+        preconditioner (see `makePreconditioner`), named ones are built for
+        the iterated system (the normal equations if they are formed)
+    onIteration: Callable[[int, Vector, float | None], None] | None
+        called after every iteration with its number, the current approximation
+        (changed in place, copy it to keep) and the residual norm if it was computed (see `Monitor`)
+
+    raises `ConvergenceException` if the required error can not be reached
 
     returns
     -------
@@ -25,33 +158,60 @@ def IterationSolve(A: Matrix, b: List[float], eps: float):
     k: int
         Number of iterations
     '''
+    assert step in ('norm', 'optimal', 'chebyshev'), step
     n = len(A)
     bv = Vector.fromIterable(b)
-    for i in range(4):
-        abs_a = A.abs(i)
-        mu = 1 / abs_a
-        B = eye(n) - A * mu
-        abs_b = B.abs(i)
-        if abs_b < 1:
-            break
+    M = None
+    if step != 'norm' or preconditioner is not None:
+        if step != 'norm':
+            A, bv = _spd(A, bv)
+        M = makePreconditioner(preconditioner, A)
+        if step == 'norm':
+            mu = 1.
+        else:
+            lmin, lmax = spectralBounds(A, preconditioner=M)
+            if step == 'chebyshev':
+                return _chebyshev(A, bv, lmin, lmax, Monitor(A, bv, eps, criteria, onIteration), M)
+            mu = 2 / (lmin + lmax)
+        if M is None:
+            B = _identity(A) - A * mu
     else:
-        bv = A.T * bv
-        A = A.T * A
         for i in range(4):
-            abs_a = A.abs()
+            abs_a = A.abs(i)
             mu = 1 / abs_a
-            B = eye(n) - A * mu
+            B = _identity(A) - A * mu
             abs_b = B.abs(i)
             if abs_b < 1:
                 break
         else:
-            raise Exception('Norm not found...')
+            with phase('normal equations'):
+                bv = A.T * bv
+                A = A.T * A
+            for i in range(4):
+                abs_a = A.abs()
+                mu = 1 / abs_a
+                B = _identity(A) - A * mu
+                abs_b = B.abs(i)
+                if abs_b < 1:
+                    break
+            else:
+                raise Exception('Norm not found...')
 
-    assert abs_b < 1, abs_b
+        assert abs_b < 1, abs_b
     c = Vector.fromIterable([mu * i for i in bv])
-    x = c.copy()
+    x = (c if M is None else M(c)).copy()
+    monitor = Monitor(A, bv, eps, criteria, onIteration)
+    xn = Vector(n)
     k = 0
-    while (A * x - bv).abs() > eps:
+    dx = None
+    while not monitor.done(k, x, dx):
         k += 1
-        x = B * x + c
-    return x, k
\ No newline at end of file
+        if M is None:
+            gemv(1., B, x, 1., c, out=xn)
+        else:
+            M(gemv(-1., A, x, 1., bv)).mul(mu, out=xn)
+            xn += x
+        if monitor.needsUpdate:
+            dx = (xn - x).abs()
+        x, xn = xn, x
+    return x, k
@@ -0,0 +1,261 @@
+'''
+Krylov
+======
+Krylov subspace methods for solving linear systems. They only need
+matrix-vector products and converge in far fewer of them than the
+fixed point iteration or the Seidel method on large well-conditioned
+systems. Like `IterationSolve` and `SeidelSolve` every method returns
+the solution and the number of iterations, iterations stop when
+`|A*x - b| <= eps`. All methods accept a preconditioner
+(see `methods/preconditioner.py`).
+'''
+
+from typing import List, Optional, Union
+
+from .backend import getBackend
+from .convergence import ConvergenceException, Monitor, StoppingCriteria
+from .matrix import Matrix, residualNorm
+from .preconditioner import makePreconditioner
+from .utility import TopDiagSolve
+from .vector import Vector
+
+
+def _inner(u: Vector, v: Vector) -> float:
+    return getBackend().inner(u.body, v.body)
+
+
+def CGSolve(A: Matrix, b: Union[Vector, List[float]], eps: float, criteria: Optional[StoppingCriteria] = None,
+            preconditioner=None):
+    '''
+    Conjugate gradient method for symmetric positive definite systems
+    (preconditioned conjugate gradients if a preconditioner is given).
+    Learn more -> https://en.wikipedia.org/wiki/Conjugate_gradient_method
+
+    params
+    ------
+    A: Matrix
+        Symmetric positive definite matrix of the system
+    b: Vector | List[float]
+        Free vector of the system
+    eps: float
+        Required residual norm
+    criteria: StoppingCriteria | None
+        iteration limit and other stopping settings
+    preconditioner: None | str | Preconditioner | Callable[[Vector], Vector]
+        symmetric positive definite preconditioner (Jacobi or SSOR)
+
+    raises `ConvergenceException` if the required error can not be reached
+    ('breakdown' if the matrix turned out not to be positive definite)
+
+    returns
+    -------
+    x: Vector
+        Vector of solution
+    k: int
+        Number of iterations
+    '''
+    b = Vector.fromIterable(b)
+    assert len(A) == len(b)
+    M = makePreconditioner(preconditioner, A)
+    monitor = Monitor(A, b, eps, criteria)
+    x = Vector(len(b))
+    r = b.copy()
+    z = r if M is None else M(r)
+    p = z.copy()
+    rz = _inner(r, z)
+    k = 0
+    dx = None
+    while not monitor.done(k, x, dx, r.abs()):
+        k += 1
+        Ap = A * p
+        pAp = _inner(p, Ap)
+        if pAp <= 0:
+            raise ConvergenceException('breakdown', x, k, r.abs())
+        alpha = rz / pAp
+        x.axpy(alpha, p)
+        r.axpy(-alpha, Ap)
+        if monitor.needsUpdate:
+            dx = abs(alpha) * p.abs()
+        z = r if M is None else M(r)
+        rz_new = _inner(r, z)
+        p *= rz_new / rz
+        p += z
+        rz = rz_new
+    return x, k
+
+def GMRESSolve(A: Matrix, b: Union[Vector, List[float]], eps: float, criteria: Optional[StoppingCriteria] = None,
+               restart: int = 30, preconditioner=None):
+    '''
+    Restarted generalized minimal residual method GMRES(m) for any nonsingular system.
+    Learn more -> https://en.wikipedia.org/wiki/Generalized_minimal_residual_method
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system
+    b: Vector | List[float]
+        Free vector of the system
+    eps: float
+        Required residual norm
+    criteria: StoppingCriteria | None
+        iteration limit and other stopping settings
+    restart: int
+        dimension of the Krylov subspace before restart
+    preconditioner: None | str | Preconditioner | Callable[[Vector], Vector]
+        right preconditioner, the residual minimized is the true one
+
+    raises `ConvergenceException` if the required error can not be reached
+    ('breakdown' if the Krylov subspace degenerates, e.g. for a singular matrix)
+
+    returns
+    -------
+    x: Vector
+        Vector of solution
+    k: int
+        Number of iterations (matrix-vector products without residual computations)
+    '''
+    b = Vector.fromIterable(b)
+    n = len(b)
+    assert len(A) == n
+    m = min(restart, n)
+    M = makePreconditioner(preconditioner, A)
+    monitor = Monitor(A, b, eps, criteria)
+    c = monitor.criteria
+    x = Vector(n)
+    r = b.copy()
+    beta = r.abs()
+    k = 0
+    if monitor.done(k, x, None, beta):
+        return x, k
+
+    def corrected(j: int) -> Vector:
+        '''
+        x plus the least squares correction from the first j basis vectors of the cycle
+        '''
+        if j == 0:
+            return x
+        y = TopDiagSolve(Matrix([row[:j] for row in H[:j]]), g[:j])
+        u = Vector(n)
+        for i in range(j):
+            u.axpy(y[i], V[i])
+        return x + (u if M is None else M(u))
+
+    while True:
+        V = [r / beta]
+        H = [[0.] * m for _ in range(m + 1)]
+        cs = [0.] * m
+        sn = [0.] * m
+        g = [0.] * (m + 1)
+        g[0] = beta
+        j = 0
+        while j < m:
+            k += 1
+            w = A * (V[j] if M is None else M(V[j]))
+            for i in range(j + 1):
+                H[i][j] = _inner(w, V[i])
+                w = w - V[i] * H[i][j]
+            hn = w.abs()
+            H[j + 1][j] = hn
+            for i in range(j):
+                H[i][j], H[i + 1][j] = cs[i] * H[i][j] + sn[i] * H[i + 1][j], -sn[i] * H[i][j] + cs[i] * H[i + 1][j]
+            d = (H[j][j] ** 2 + hn ** 2) ** 0.5
+            if d == 0:
+                x = corrected(j)
+                raise ConvergenceException('breakdown', x, k, residualNorm(A, x, b))
+            cs[j], sn[j] = H[j][j] / d, hn / d
+            H[j][j], H[j + 1][j] = d, 0.
+            g[j], g[j + 1] = cs[j] * g[j], -sn[j] * g[j]
+            j += 1
+            if k % c.checkEvery == 0 or k >= c.maxIter:
+                # |g[j]| is the residual norm of the current least squares solution
+                xk = corrected(j)
+                if monitor.done(k, xk, None, abs(g[j])):
+                    return xk, k
+            if hn == 0:
+                break
+            V.append(w / hn)
+        x = corrected(j)
+        r = b - A * x
+        beta = r.abs()
+        # the true residual of the restart is checked unless the estimate of this iteration just was
+        if monitor.checked != k:
+            if monitor.done(k, x, None, beta):
+                return x, k
+        elif beta <= monitor.tol:
+            return x, k
+
+def BiCGSTABSolve(A: Matrix, b: Union[Vector, List[float]], eps: float, criteria: Optional[StoppingCriteria] = None,
+                  preconditioner=None):
+    '''
+    Biconjugate gradient stabilized method for nonsymmetric systems.
+    Learn more -> https://en.wikipedia.org/wiki/Biconjugate_gradient_stabilized_method
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system
+    b: Vector | List[float]
+        Free vector of the system
+    eps: float
+        Required residual norm
+    criteria: StoppingCriteria | None
+        iteration limit and other stopping settings
+    preconditioner: None | str | Preconditioner | Callable[[Vector], Vector]
+        right preconditioner
+
+    raises `ConvergenceException` if the required error can not be reached
+    ('breakdown' if a denominator of the method vanishes)
+
+    returns
+    -------
+    x: Vector
+        Vector of solution
+    k: int
+        Number of iterations (two matrix-vector products each)
+    '''
+    b = Vector.fromIterable(b)
+    n = len(b)
+    assert len(A) == n
+    M = makePreconditioner(preconditioner, A)
+    monitor = Monitor(A, b, eps, criteria)
+    x = Vector(n)
+    r = b.copy()
+    r0 = r.copy()
+    rho = alpha = omega = 1.
+    v = Vector(n)
+    p = Vector(n)
+    k = 0
+    dx = None
+    while not monitor.done(k, x, dx, r.abs()):
+        k += 1
+        rho_new = _inner(r0, r)
+        if rho_new == 0 or omega == 0:
+            raise ConvergenceException('breakdown', x, k, r.abs())
+        beta = rho_new / rho * alpha / omega
+        p = r + (p - v * omega) * beta
+        ph = p if M is None else M(p)
+        v = A * ph
+        r0v = _inner(r0, v)
+        if r0v == 0:
+            raise ConvergenceException('breakdown', x, k, r.abs())
+        alpha = rho_new / r0v
+        s = r - v * alpha
+        if s.abs() <= monitor.tol:
+            step = ph * alpha
+            x = x + step
+            r = s
+            omega = 1.
+        else:
+            sh = s if M is None else M(s)
+            t = A * sh
+            tt = _inner(t, t)
+            if tt == 0:
+                raise ConvergenceException('breakdown', x, k, r.abs())
+            omega = _inner(t, s) / tt
+            step = ph * alpha + sh * omega
+            x = x + step
+            r = s - t * omega
+        rho = rho_new
+        if monitor.needsUpdate:
+            dx = step.abs()
+    return x, k
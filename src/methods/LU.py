@@ -1,39 +1,173 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, List, Optional, Tuple, Union
+
+from .backend import getBackend
 from .vector import Vector
-from .utility import BotDiagSolve, TopDiagSolve, permutation
-from .matrix import Matrix, ShapeException, zeros
+from .cache import FactorizationCache
+from .utility import BotDiagSolve, Factorization, TopDiagSolve
+from .matrix import Matrix, Permutation, ShapeException, zeros
+from .stats import timed
 
 
 def LU(A: Matrix):
     '''
-    LU matrix decomposition. Learn more on the wiki -> https://en.wikipedia.org/wiki/LU_decomposition
+    LU matrix decomposition without pivoting. Learn more on the wiki -> https://en.wikipedia.org/wiki/LU_decomposition
 
     params
     ------
     A: Matrix
-        Matrix for decomposition
-    
+        Matrix for decomposition (its leading principal minors must not be zero)
+
     returns matrices such that L*U = A and L is the lower diagonal matrix, U is the upper diagonal matrix
     '''
-    l = zeros(A.size)
-    u = Matrix(A.matrix)
-    for i in range(A.size):
-        for j in range(i, A.size):
-            l[j,i] = u[j,i] / u[i,i]
-    for k in range(1, u.size):
-        for i in range(k-1, A.size):
-            for j in range(i, A.size):
-                l[j,i] = u[j,i] / u[i,i]
-        for i in range(k, u.size):
-            for j in range(k-1, u.size):
-                u[i, j] = u[i, j] - l[i, k-1] * u[k-1, j]
+    n = A.size
+    d = array('d', A.data)
+    backend = getBackend()
+    for k in range(n - 1):
+        backend.eliminate(d, n, k)
+    return unpack(Matrix.fromBuffer(d, n))
+
+def PackedLU(A: Matrix, blockSize: int = 64, workers: int = 1) -> Tuple[Permutation, Matrix]:
+    '''
+    Blocked LU decomposition with partial pivoting (on every step the row
+    with the greatest by magnitude element of the column becomes the pivot one).
+    Columns are factored by panels of `blockSize`, after every panel the
+    trailing matrix gets one rank-`blockSize` update, which is split by rows
+    between `workers` threads (they run in parallel with the NumPy backend).
+    Both factors are stored in one buffer. Time complexity - O(n^3)
+
+    params
+    ------
+    A: Matrix
+        Matrix for decomposition
+    blockSize: int
+        number of columns in a panel
+    workers: int
+        number of threads updating the trailing matrix
+
+    raises `ZeroDivisionError` if the matrix is singular
+
+    returns
+    -------
+    P: Permutation
+        rows permutation chosen by pivoting
+    LU: Matrix
+        U in the upper triangle and L without its unit diagonal below it, `L*U = P*A`
+    '''
+    assert blockSize > 0 and workers > 0
+    n = A.size
+    d = array('d', A.data)
+    P = Permutation(n)
+    backend = getBackend()
+    pool = ThreadPoolExecutor(workers) if workers > 1 else None
+    try:
+        for k0 in range(0, n, blockSize):
+            k1 = min(k0 + blockSize, n)
+            for k, p in enumerate(backend.luPanel(d, n, k0, k1), k0):
+                P.swap(k, p)
+            if k1 == n:
+                break
+            if pool is None:
+                backend.luUpdate(d, n, k0, k1, k1, n)
+            else:
+                step = -(-(n - k1) // workers)
+                list(pool.map(lambda r0: backend.luUpdate(d, n, k0, k1, r0, min(r0 + step, n)), range(k1, n, step)))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return P, Matrix.fromBuffer(d, n)
 
-    return l, u
+def unpack(LU: Matrix) -> Tuple[Matrix, Matrix]:
+    '''
+    Splits the packed LU decomposition (see `PackedLU`) into
+    the unit lower diagonal matrix L and the upper diagonal matrix U
+    '''
+    n = LU.size
+    d = LU.data
+    L = zeros(n)
+    U = zeros(n)
+    for i in range(n):
+        L.data[i*n:i*n+i] = d[i*n:i*n+i]
+        L.data[i*n+i] = 1.
+        U.data[i*n+i:(i+1)*n] = d[i*n+i:(i+1)*n]
+    return L, U
 
-@permutation
-def SolveLU(A: Matrix, b: Vector):
+def PLU(A: Matrix, blockSize: int = 64, workers: int = 1):
+    '''
+    LU decomposition with partial pivoting, params are the same as of `PackedLU`
+
+    returns permutation P, unit lower diagonal matrix L and upper diagonal matrix U such that `L*U = P*A`
+    '''
+    P, LU = PackedLU(A, blockSize, workers)
+    return (P, *unpack(LU))
+
+class LUFactorization(Factorization):
+    '''
+    LU decomposition with partial pivoting of the system matrix (see `PackedLU`).
+    The matrix is decomposed once, after that every right-hand side is
+    solved by two triangular solutions in O(n^2)
+
+    attributes
+    ----------
+    P: Permutation
+        rows permutation chosen by pivoting
+    LU: Matrix
+        packed factors, `L*U = P*A`
+    '''
+    @timed('factorization')
+    def __init__(self, A: Matrix, blockSize: int = 64, workers: int = 1):
+        '''
+        params
+        ------
+        A: Matrix
+            matrix of system
+        blockSize: int
+            number of columns in a panel of the decomposition
+        workers: int
+            number of threads updating the trailing matrix
+        '''
+        self.P, self.LU = PackedLU(A, blockSize, workers)
+
+    @property
+    def L(self) -> Matrix:
+        '''
+        Unit lower diagonal matrix
+        '''
+        return unpack(self.LU)[0]
+
+    @property
+    def U(self) -> Matrix:
+        '''
+        Upper diagonal matrix
+        '''
+        return unpack(self.LU)[1]
+
+    def __len__(self):
+        return len(self.LU)
+
+    def solve(self, b: Union[Vector, List[float]]) -> Vector:
+        '''
+        Solves the system `A*x = b` with the stored decomposition
+
+        params
+        ------
+        b: Vector | List[float]
+            free vector of system
+
+        returns solution vector
+        '''
+        assert len(self) == len(b), ShapeException(len(self), len(b))
+        b = self.P * Vector.fromIterable(b)
+        y = BotDiagSolve(self.LU, b, unit=True)
+        return TopDiagSolve(self.LU, y)
+
+
+def SolveLU(A: Matrix, b: Vector, cache: Optional[FactorizationCache] = None, key: Hashable = None):
     '''
     Solves the system `A*x = b` as follows: `L*y=b` - > we get y. `U*x = y` -> we get x.
-    Time complesety - O(n^3)
+    Time complesety - O(n^3), O(n^2) if the decomposition of A is taken from cache.
+    To solve many systems with the same matrix use `LUFactorization`
 
     params
     ------
@@ -41,11 +175,13 @@ def SolveLU(A: Matrix, b: Vector):
         matrix of system
     b: Vector
         free vector of system
-    
+    cache: FactorizationCache | None
+        cache of decompositions to take the decomposition from (or store it in)
+    key: Hashable | None
+        explicit cache key of A, by default the fingerprint of A is used
+
     returns solution vector
     '''
     assert len(A) == len(b), ShapeException(len(A), len(b))
-    l, u = LU(A)
-    y = BotDiagSolve(l, b)
-    x = TopDiagSolve(u, y)
-    return x
\ No newline at end of file
+    f = LUFactorization(A) if cache is None else cache.get(A, LUFactorization, key)
+    return f.solve(b)
@@ -1,52 +1,129 @@
-from functools import reduce
-from typing import List
+from array import array
+from typing import Hashable, List, Optional, Union
 
-from .utility import TopDiagSolve, permutation
-from .matrix import Matrix, dot, eye
-from .vector import ort
+from .backend import getBackend
+from .cache import FactorizationCache
+from .utility import Factorization, TopDiagSolve
+from .matrix import Matrix, ShapeException, eye
+from .stats import timed
+from .vector import Vector
+
+
+class QRFactorization(Factorization):
+    '''
+    Householder QR decomposition in compact form. Only the Householder
+    vectors `w_k` of reflections `H_k = I - 2*w_k*w_k^T` and the upper
+    triangular matrix R are stored, `Q = H_0 * H_1 * ... * H_(n-2)`.
+    Each reflection is applied to R as a rank-1 update, so the
+    decomposition takes O(n^3) time and O(n^2) memory.
+    Learn more - https://en.wikipedia.org/wiki/QR_decomposition .
+
+    attributes
+    ----------
+    R: Matrix
+        upper triangular matrix
+    W: List[array | None]
+        Householder vectors, `W[k]` acts on components from k to n
+        (None if the step did not need a reflection)
+    '''
+    @timed('factorization')
+    def __init__(self, A: Matrix):
+        '''
+        params
+        ------
+        A: Matrix
+            Matrix for decomposition
+        '''
+        backend = getBackend()
+        n = len(A)
+        R = A.copy()
+        d = R.data
+        self.W: List[Optional[array]] = []
+        for k in range(n-1):
+            y = d[k*n+k::n]
+            a = backend.sumsq(y) ** 0.5
+            if a == 0:
+                self.W.append(None)
+                continue
+            alpha = -a if y[0] >= 0 else a
+            y[0] -= alpha
+            w = backend.div(y, backend.sumsq(y) ** 0.5)
+            backend.reflect(d, n, k, w)
+            d[k*n+k::n] = array('d', [alpha]) + array('d', [0.]) * (n-k-1)
+            self.W.append(w)
+        self.R = R
+
+    def __len__(self):
+        return len(self.R)
+
+    def applyQT(self, b: Union[Vector, List[float]]) -> Vector:
+        '''
+        Computes `Q.T * b` applying the reflections one by one without forming Q
+
+        params
+        ------
+        b: Vector | List[float]
+            vector to multiply
+        '''
+        backend = getBackend()
+        y = Vector.fromIterable(b)
+        for k, w in enumerate(self.W):
+            if w is None:
+                continue
+            yk = y.body[k:]
+            y.body[k:] = backend.sub(yk, backend.scale(w, 2 * backend.inner(w, yk)))
+        return y
+
+    @property
+    def Q(self) -> Matrix:
+        '''
+        Orthogonal matrix Q formed explicitly from the reflections. Costs O(n^3)
+        '''
+        backend = getBackend()
+        n = len(self.R)
+        Q = eye(n)
+        for k in range(len(self.W)-1, -1, -1):
+            if self.W[k] is not None:
+                backend.reflect(Q.data, n, k, self.W[k])
+        return Q
+
+    def solve(self, b: Union[Vector, List[float]]) -> Vector:
+        '''
+        Solves the system `A*x = b`: `y = Q.T * b`, then `R*x = y`
+
+        params
+        ------
+        b: Vector | List[float]
+            Free vector of the system
+
+        returns solution vector
+        '''
+        assert len(self) == len(b), ShapeException(len(self), len(b))
+        return TopDiagSolve(self.R, self.applyQT(b))
 
 
 def QR(A: Matrix):
     '''
-    Decomposes the original matrix an orthogonal matrix Q and an upper triangular matrix R. 
+    Decomposes the original matrix an orthogonal matrix Q and an upper triangular matrix R.
     Learn more - https://en.wikipedia.org/wiki/QR_decomposition .
+    Q is formed explicitly, to solve systems use `QRFactorization` that keeps it in compact form
 
     params
     ------
     A: Matrix
         Matrix for decomposition
-    
-    returns matrices such that L*U = A and L is the lower diagonal matrix, U is the upper diagonal matrix
+
+    returns matrices such that Q*R = A and Q is the orthogonal matrix, R is the upper diagonal matrix
     '''
-    n = len(A)
-    Q = eye(n)
-    Q_steps: List[Matrix] = []
-    R = Matrix(A.matrix)
-    for i in range(n-1):
-        Rc = R[i:]
-        y = Rc[:,0]
-        a = y.abs()
-        z = ort(n-i, 0)
-        w = y - z * a
-        w = w / w.abs()
-        Q_ii = eye(n-i) - dot(w,w) * 2
-        R_ii = Q_ii * Rc
-        for x in range(n-i):
-            for y in range(n-i):
-                R[i+x,i+y] = R_ii[x,y]
-        Q = Q_ii.extend(n)
-        Q_steps.append(Q)
-
-    Q = reduce(lambda x,y: y*x, reversed(Q_steps))
-    return Q, R
-
-@permutation
-def QRSolve(A: Matrix, b: List[float]):
+    f = QRFactorization(A)
+    return f.Q, f.R
+
+def QRSolve(A: Matrix, b: List[float], cache: Optional[FactorizationCache] = None, key: Hashable = None):
     '''
     Solves linear system with QR decomposition
 
     `y = Q.T * b` -> y vector. Such as the R is upper triangular matrix
-    we can easy solve it.
+    we can easy solve it. Q is never formed, reflections are applied to b directly.
 
     params
     ------
@@ -54,12 +131,15 @@ def QRSolve(A: Matrix, b: List[float]):
         Matrix of the system
     b: Vector | List[float]
         Free vector of the system
+    cache: FactorizationCache | None
+        cache of decompositions to take the decomposition from (or store it in)
+    key: Hashable | None
+        explicit cache key of A, by default the fingerprint of A is used
     '''
     n = len(A)
     assert n == len(b)
-    Q, R = QR(A)
-    y = Q.T * b
-    return TopDiagSolve(R, y)
+    f = QRFactorization(A) if cache is None else cache.get(A, QRFactorization, key)
+    return f.solve(b)
 
 if __name__ == '__main__':
     A = Matrix([
@@ -68,4 +148,4 @@ if __name__ == '__main__':
         [1, 1, 7]
     ])
     b = [5, 7, 9]
-    print(QRSolve(A,b))
\ No newline at end of file
+    print(QRSolve(A,b))
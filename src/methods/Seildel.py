@@ -1,23 +1,135 @@
-from typing import List, Union
+from typing import Callable, List, Optional, Union
 from .utility import permutation
+from .convergence import Monitor, StoppingCriteria
+from .preconditioner import JacobiPreconditioner, makePreconditioner
+from .stats import count, currentStats, phase
 
 from .vector import Vector
-from .matrix import Matrix, zeros
+from .matrix import Matrix, gemv, isDiagonallyDominant, isPositiveDefinite, isSymmetric
+from .sparse import SparseMatrix
+
+
+def converges(A: Matrix) -> bool:
+    '''
+    Sufficient conditions of Seidel method convergence on the matrix itself:
+    strict diagonal dominance or symmetric positive definiteness
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system
+    '''
+    return isDiagonallyDominant(A) or isSymmetric(A) and isPositiveDefinite(A)
+
+def estimateOmega(A: Matrix, iterations: int = 30) -> float:
+    '''
+    Estimates the optimal SOR relaxation parameter
+    `omega = 2 / (1 + (1 - rho^2)^0.5)`, where rho is the spectral
+    radius of the Jacobi iteration matrix `I - D^-1 * A` found by
+    the power iteration. Returns 1 if the estimate is not below 1
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system (without zeros on the diagonal)
+    iterations: int
+        number of power iterations
+    '''
+    n = len(A)
+    d = [A[i, i] for i in range(n)]
+    v = Vector.fromIterable([1 / (i + 1) for i in range(n)])
+    v = v / v.abs()
+    rho = 0.
+    for _ in range(iterations):
+        Av = A * v
+        Jv = Vector.fromIterable([v[i] - Av[i] / d[i] for i in range(n)])
+        rho = Jv.abs()
+        if rho == 0:
+            return 1.
+        v = Jv / rho
+    if rho >= 1:
+        return 1.
+    return 2 / (1 + (1 - rho * rho) ** 0.5)
+
+def sweep(A: Matrix, b: Vector, x: Vector, omega: float = 1.):
+    '''
+    One in-place Seidel (SOR if omega != 1) sweep:
+    `x_i = (1 - omega)*x_i + omega*(b_i - Sum_(j != i)(a_ij*x_j)) / a_ii`
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system
+    b: Vector
+        Free vector of the system
+    x: Vector
+        current approximation, updated in place
+    omega: float
+        relaxation parameter
+
+    returns norm of the update of x
+    '''
+    n = len(A)
+    xb = x.body
+    diag = A.diagonal()
+    dd = 0.
+    for i in range(n):
+        aii = diag[i]
+        s = b[i] - A.rowDot(i, xb) + aii * xb[i]
+        delta = omega * (s / aii - xb[i])
+        xb[i] += delta
+        dd += delta * delta
+    if currentStats() is not None:
+        stored = A.nnz if isinstance(A, SparseMatrix) else n * n if isinstance(A, Matrix) else len(A.data)
+        count('flops', 2 * stored + 5 * n)
+    return dd ** 0.5
 
 @permutation
-def SeidelSolve(A: Matrix, b: Union[Vector, List[float]], eps: float):
+def SeidelSolve(A: Matrix, b: Union[Vector, List[float]], eps: float, omega: Union[float, str] = 1.,
+                criteria: Optional[StoppingCriteria] = None, preconditioner=None,
+                onIteration: Optional[Callable[[int, Vector, Optional[float]], None]] = None):
     '''
-    Seidel's iterative method for solving systems of algebraic 
+    Seidel's iterative method for solving systems of algebraic
     linear equations. Learn more -> https://en.wikipedia.org/wiki/Gauss%E2%80%93Seidel_method
 
+    If the matrix is diagonally dominant or symmetric positive definite
+    the sweeps are done on the system itself, otherwise on the normal
+    equations `A.T*A*x = A.T*b` (they always converge, but the condition
+    number is squared)
+
+    With a preconditioner M the sweeps are done on the system
+    `M^-1*A*x = M^-1*b` for a dense matrix or the Jacobi preconditioner.
+    Forming `M^-1*A` costs n applications of M (O(n^2) for the Jacobi
+    preconditioner, O(n^3) for SSOR and ILU(0)), it is kept by the
+    preconditioner, so further solves with the same matrix and preconditioner
+    do not repeat it. For a sparse or band matrix `M^-1*A` would be dense,
+    so instead every sweep is preceded by the correction `x = x + M^-1*(b - A*x)`
+    on the swept system. If the normal equations are needed, named preconditioners
+    are built for them, while a given `Preconditioner` or function (built for A)
+    is applied as for a dense matrix: `M^-1*A` is formed and densified and the
+    normal equations of the preconditioned system are solved
+
     params
     ------
-    A: Matrix
+    A: Matrix | SparseMatrix | BandedMatrix
         Matrix of the system
     b: Vactor | List[float]
         Free vector of the system
     eps: float
         Required methodological error of the solution
+    omega: float | 'auto'
+        SOR relaxation parameter from (0, 2), 1 - plain Seidel method,
+        'auto' - estimated with `estimateOmega`
+    criteria: StoppingCriteria | None
+        iteration limit and other stopping settings
+    preconditioner: None | str | Preconditioner | Callable[[Vector], Vector]
+        preconditioner (see `makePreconditioner`), named ones are built
+        for the (permuted) matrix of the system
+    onIteration: Callable[[int, Vector, float | None], None] | None
+        called after every iteration with its number, the current approximation
+        (changed in place, copy it to keep) and the residual norm if it was computed (see `Monitor`)
+
+    raises `ConvergenceException` if the required error can not be reached
 
     returns
     -------
@@ -27,22 +139,38 @@ def SeidelSolve(A: Matrix, b: Union[Vector, List[float]], eps: float):
         Number of iterations
     '''
     b = Vector.fromIterable(b)
-    b = A.T * b
-    A = A.T*A 
     assert len(A) == len(b)
-    if isinstance(b, list):
-        b = Vector.fromIterable(b)
+    M = makePreconditioner(preconditioner, A)
+    monitor = None
+    if M is not None and (isinstance(A, Matrix) or isinstance(M, JacobiPreconditioner) or
+                          not isinstance(preconditioner, str) and not converges(A)):
+        # a given preconditioner is built for A and can not be rebuilt for the normal equations,
+        # so then M^-1*A is formed (densified) like for a dense matrix
+        monitor = Monitor(A, b, eps, criteria, onIteration)
+        A, b = M.applyMatrix(A), M(b)
+        M = None
+    if not converges(A):
+        with phase('normal equations'):
+            b = A.T * b
+            A = A.T*A
+        if M is not None and isinstance(preconditioner, str):
+            M = makePreconditioner(preconditioner, A)
     n = len(A)
-    d = Vector.fromIterable([b[i] / A[i, i] for i in range(n)])
-    C = zeros(n)
-    for i in range(n):
-        for j in range(n):
-            C[i, j] = 0 if (i == j) else - (A[i, j] / A[i, i])
-    x = d.copy()
+    if omega == 'auto':
+        omega = estimateOmega(A)
+    assert 0 < omega < 2, omega
+    x = Vector.fromIterable([b[i] / A[i, i] for i in range(n)])
+    if monitor is None:
+        monitor = Monitor(A, b, eps, criteria, onIteration)
     k = 0
-    while (A * x - b).abs() > eps:
+    dx = None
+    while not monitor.done(k, x, dx):
         k += 1
-        for i in range(n):
-            x[i] = sum(C[i] * x) + d[i]
+        if M is None:
+            dx = sweep(A, b, x, omega)
+            continue
+        previous = x.copy()
+        x += M(gemv(-1., A, x, 1., b))
+        sweep(A, b, x, omega)
+        dx = (x - previous).abs()
     return x, k
-
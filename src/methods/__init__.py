@@ -0,0 +1,7 @@
+'''
+Methods of solving systems of linear algebraic equations.
+`solve` picks a method by the structure of the matrix, every
+method is also available from its own module
+'''
+
+from .dispatch import solve
@@ -0,0 +1,179 @@
+'''
+Command line solving a stream of systems, run from `src`:
+
+    python -m methods systems.jsonl > solutions.jsonl
+    cat systems.bin | python -m methods --method cholesky --workers 4 --output-format binary > x.bin
+
+Input (a file or stdin) is either JSON lines or concatenated records of the
+binary format of `storage` (written by `storage.dump`), the format is detected
+by the first bytes. A JSON line is an object with
+
+    "A" - rows of a dense matrix, {"n", "rows", "cols", "vals"} of a sparse
+          matrix in the coordinate format or {"n", "diagonals": {"-1": [...], "0": [...]}}
+          of a band matrix
+    "b" - free vector
+    "id", "method", "eps" - optional, the id is the number of the system by default
+
+Systems are read only when there is room for them: at most `--max-pending`
+systems are being solved or wait for their output, and a result is written
+and flushed as soon as it is ready, so memory does not grow with the stream
+and a slow reader of the output slows down reading of the input.
+Results are JSON lines {"id", "status", "x", "method", "iterations", "time", "error"}
+or binary records of the solution vectors (NaN for failed systems, always in the input order).
+Exit code is 1 if some system was not solved
+'''
+
+import argparse
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from . import storage
+from .backend import setBackend
+from .batch import Record, _methods, solveRecord
+from .vector import Vector
+
+
+def readRecords(f: BinaryIO, fmt: str = 'auto') -> Iterator[Record]:
+    '''
+    Lazily reads records of systems from the binary stream
+
+    params
+    ------
+    f: BinaryIO
+        stream opened for binary reading (e.g. `sys.stdin.buffer`)
+    fmt: str
+        'jsonl', 'binary' or 'auto' - binary if the stream starts with `storage.MAGIC`
+    '''
+    if fmt == 'auto':
+        head = f.peek(len(storage.MAGIC))[:len(storage.MAGIC)]
+        fmt = 'binary' if head == storage.MAGIC else 'jsonl'
+    if fmt == 'binary':
+        while True:
+            obj = storage.read(f)
+            if obj is None:
+                return
+            yield obj
+    else:
+        for line in f:
+            if line.strip():
+                yield line
+
+def solveStream(records: Iterable[Record], method: str = 'auto', eps: Optional[float] = None, workers: int = 1,
+                maxPending: Optional[int] = None, ordered: bool = False) -> Iterator[dict]:
+    '''
+    Solves a stream of systems yielding results as they are finished
+
+    params
+    ------
+    records: Iterable[bytes | (A, b)]
+        JSON lines or systems, the iterable is advanced only when there is room for a new system
+    method: str
+        default method, one of `batch._methods` ('auto' is `dispatch.solve`)
+    eps: float | None
+        default required error, iterative methods use 1e-6 if it is None
+    workers: int
+        number of processes, 1 - solve in the current process
+    maxPending: int | None
+        greatest number of systems being solved or waiting for output (2*workers by default)
+    ordered: bool
+        yield results in the order of the records
+
+    returns iterator of results of `solveRecord`
+    '''
+    if workers <= 1:
+        for i, record in enumerate(records):
+            yield solveRecord(i, record, method, eps)
+        return
+    maxPending = maxPending or 2 * workers
+    records = enumerate(records)
+    pending = {}  # future -> number of record
+    finished = {}  # number of record -> result waiting for the previous ones
+    following = 0
+    exhausted = False
+    with ProcessPoolExecutor(workers) as pool:
+        while True:
+            while not exhausted and len(pending) + len(finished) < maxPending:
+                item = next(records, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    pending[pool.submit(solveRecord, item[0], item[1], method, eps)] = item[0]
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                if ordered:
+                    finished[i] = future.result()
+                else:
+                    yield future.result()
+            while following in finished:
+                yield finished.pop(following)
+                following += 1
+
+
+def writeJson(result: dict, f):
+    result = dict(result)
+    del result['n']
+    if result['x'] is not None:
+        result['x'] = list(result['x'])
+    f.write(json.dumps(result) + '\n')
+    f.flush()
+
+def writeBinary(result: dict, f: BinaryIO):
+    x = result['x']
+    if x is None:
+        x = Vector.fromIterable([float('nan')] * (result['n'] or 0))
+    storage.dump(Vector.fromIterable(x), f)
+    f.flush()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m methods', description='Solves a stream of linear systems')
+    parser.add_argument('input', nargs='?', help='file with systems (stdin if not given)')
+    parser.add_argument('-o', '--output', help='file to write results to (stdout if not given)')
+    parser.add_argument('--format', choices=['auto', 'jsonl', 'binary'], default='auto', help='format of the input')
+    parser.add_argument('--output-format', choices=['jsonl', 'binary'], default='jsonl')
+    parser.add_argument('--method', choices=list(_methods), default='auto')
+    parser.add_argument('--eps', type=float, help='required error, iterative methods use 1e-6 if not given, '
+                                                  "'auto' uses iterative methods only if it is given")
+    parser.add_argument('--workers', type=int, default=1, help='number of processes')
+    parser.add_argument('--max-pending', type=int, help='systems in flight, 2*workers by default')
+    parser.add_argument('--ordered', action='store_true', help='write results in the input order')
+    parser.add_argument('--backend', choices=['python', 'numpy'], help='arithmetic backend')
+    parser.add_argument('--quiet', action='store_true', help='do not report failed systems to stderr')
+    args = parser.parse_args(argv)
+    if args.backend:
+        setBackend(args.backend)
+
+    binary = args.output_format == 'binary'
+    source = open(args.input, 'rb') if args.input else sys.stdin.buffer
+    if args.output:
+        sink = open(args.output, 'wb' if binary else 'w')
+    else:
+        sink = sys.stdout.buffer if binary else sys.stdout
+    failed = 0
+    try:
+        results = solveStream(readRecords(source, args.format), args.method, args.eps, args.workers,
+                              args.max_pending, args.ordered or binary)
+        for result in results:
+            if result['status'] != 'ok':
+                failed += 1
+                if not args.quiet:
+                    print(f"system {result['id']}: {result['status']} {result.get('error', '')}", file=sys.stderr)
+            (writeBinary if binary else writeJson)(result, sink)
+    except BrokenPipeError:
+        sys.stderr.close()  # the reader of the output has gone
+        return 1
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
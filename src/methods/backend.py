@@ -0,0 +1,472 @@
+'''
+Backend
+=======
+Kernels doing the arithmetic of `Matrix` and `Vector` on their flat
+`array('d')` buffers. `reflect`, `eliminate`, `luPanel` and `luUpdate`
+are the only kernels changing their argument in place: `reflect` applies
+the Householder reflection `I - 2*w*w^T` to the trailing `(n-k)x(n-k)`
+block of a matrix buffer, `eliminate` does k'th step of the Gaussian
+elimination, `luPanel` and `luUpdate` are the steps of the blocked LU
+decomposition (see `methods/LU.py`). Elementwise kernels, `matvec`,
+`axpy` and `gemv` also write their result into a given `out` (`y`) buffer
+instead of allocating a new one. Two implementations are available: pure Python
+(always) and NumPy (only when `numpy` is installed). NumPy is picked by
+default if it can be imported, `setBackend` switches between them.
+While the instrumentation is on (see `methods/stats.py`) `getBackend`
+returns the backend wrapped into `CountingBackend`.
+'''
+
+from array import array
+from operator import add, mul, sub
+from typing import Dict, Optional
+
+from .stats import SolveStats, currentStats
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class PythonBackend:
+    '''
+    Kernels written with plain Python loops over row slices of the buffers
+    '''
+    name = 'python'
+
+    @staticmethod
+    def _out(r: array, out: Optional[array]) -> array:
+        if out is None:
+            return r
+        out[:] = r
+        return out
+
+    def add(self, a: array, b: array, out: Optional[array] = None) -> array:
+        return self._out(array('d', map(add, a, b)), out)
+
+    def sub(self, a: array, b: array, out: Optional[array] = None) -> array:
+        return self._out(array('d', map(sub, a, b)), out)
+
+    def mul(self, a: array, b: array, out: Optional[array] = None) -> array:
+        return self._out(array('d', map(mul, a, b)), out)
+
+    def scale(self, a: array, s: float, out: Optional[array] = None) -> array:
+        return self._out(array('d', [i * s for i in a]), out)
+
+    def div(self, a: array, s: float, out: Optional[array] = None) -> array:
+        return self._out(array('d', [i / s for i in a]), out)
+
+    def axpy(self, alpha: float, x: array, y: array) -> array:
+        y[:] = array('d', [yi + alpha * xi for xi, yi in zip(x, y)])
+        return y
+
+    def sumsq(self, a: array) -> float:
+        return sum([i*i for i in a])
+
+    def inner(self, a: array, b: array) -> float:
+        return sum(map(mul, a, b))
+
+    def matmul(self, a: array, b: array, n: int) -> array:
+        cols = [b[j::n] for j in range(n)]
+        r = array('d')
+        for i in range(n):
+            row = a[i*n:(i+1)*n]
+            r.extend([sum(map(mul, row, col)) for col in cols])
+        return r
+
+    def matvec(self, a: array, x: array, n: int, out: Optional[array] = None) -> array:
+        return self._out(array('d', [sum(map(mul, a[i*n:(i+1)*n], x)) for i in range(n)]), out)
+
+    def gemv(self, a: array, x: array, n: int, alpha: float, beta: float, y: Optional[array],
+             out: Optional[array] = None) -> array:
+        ax = [sum(map(mul, a[i*n:(i+1)*n], x)) for i in range(n)]
+        if beta and y is not None:
+            return self._out(array('d', [alpha * s + beta * yi for s, yi in zip(ax, y)]), out)
+        return self._out(array('d', [alpha * s for s in ax]), out)
+
+    def residualNorm(self, a: array, x: array, b: array, n: int) -> float:
+        return sum([(sum(map(mul, a[i*n:(i+1)*n], x)) - bi) ** 2 for i, bi in enumerate(b)]) ** 0.5
+
+    def transpose(self, a: array, n: int) -> array:
+        t = array('d')
+        for j in range(n):
+            t.extend(a[j::n])
+        return t
+
+    def outer(self, x: array, y: array) -> array:
+        r = array('d')
+        for i in x:
+            r.extend([i * j for j in y])
+        return r
+
+    def reflect(self, a: array, n: int, k: int, w: array):
+        for j in range(k, n):
+            col = a[k*n+j::n]
+            s = 2 * sum(map(mul, w, col))
+            if s:
+                a[k*n+j::n] = array('d', [c - s*wi for c, wi in zip(col, w)])
+
+    def eliminate(self, a: array, n: int, k: int):
+        piv = a[k*n+k]
+        u = a[k*n+k+1:(k+1)*n]
+        for i in range(k+1, n):
+            l = a[i*n+k] / piv
+            a[i*n+k] = l
+            if l:
+                a[i*n+k+1:(i+1)*n] = array('d', [x - l*y for x, y in zip(a[i*n+k+1:(i+1)*n], u)])
+
+    def cholesky(self, a: array, n: int) -> array:
+        l = array('d')
+        for i in range(n):
+            start = len(l)
+            row = a[i*n:i*n+i+1]
+            for j in range(i):
+                lj = l[j*(j+1)//2:j*(j+1)//2+j+1]
+                l.append((row[j] - sum(map(mul, l[start:start+j], lj))) / lj[j])
+            s = row[i] - sum(map(mul, l[start:], l[start:]))
+            if not s > 0:
+                raise ValueError('matrix is not positive definite')
+            l.append(s ** 0.5)
+        return l
+
+    def luPanel(self, a: array, n: int, k0: int, k1: int) -> array:
+        pivots = array('q')
+        for k in range(k0, k1):
+            col = a[k*n+k::n]
+            p = k + max(range(n - k), key=lambda i: abs(col[i]))
+            if col[p - k] == 0:
+                raise ZeroDivisionError('matrix is singular')
+            pivots.append(p)
+            if p != k:
+                a[k*n:(k+1)*n], a[p*n:(p+1)*n] = a[p*n:(p+1)*n], a[k*n:(k+1)*n]
+            piv = a[k*n+k]
+            u = a[k*n+k+1:k*n+k1]
+            for i in range(k+1, n):
+                l = a[i*n+k] / piv
+                a[i*n+k] = l
+                if l:
+                    a[i*n+k+1:i*n+k1] = array('d', [x - l*y for x, y in zip(a[i*n+k+1:i*n+k1], u)])
+        for k in range(k0, k1):
+            u = a[k*n+k1:(k+1)*n]
+            for i in range(k+1, k1):
+                l = a[i*n+k]
+                if l:
+                    a[i*n+k1:(i+1)*n] = array('d', [x - l*y for x, y in zip(a[i*n+k1:(i+1)*n], u)])
+        return pivots
+
+    def luUpdate(self, a: array, n: int, k0: int, k1: int, r0: int, r1: int):
+        us = [a[k*n+k1:(k+1)*n] for k in range(k0, k1)]
+        for i in range(r0, r1):
+            row = a[i*n+k1:(i+1)*n]
+            for l, u in zip(a[i*n+k0:i*n+k1], us):
+                if l:
+                    row = array('d', [x - l*y for x, y in zip(row, u)])
+            a[i*n+k1:(i+1)*n] = row
+
+    def norm(self, a: array, n: int, t: int) -> float:
+        if t == 0:
+            return max(map(abs, a))
+        elif t == 1:
+            return max(sum(map(abs, a[i*n:(i+1)*n])) for i in range(n))
+        elif t == 2:
+            return max(sum(map(abs, a[j::n])) for j in range(n))
+        elif t == 3:
+            return sum(map(abs, a)) ** 0.5
+
+
+class NumpyBackend:
+    '''
+    Kernels running as vectorized NumPy operations. The buffers are
+    wrapped by `numpy.frombuffer` without copying, results are copied
+    back into new `array('d')` buffers
+    '''
+    name = 'numpy'
+
+    @staticmethod
+    def _np(a: array, n: int = 0):
+        v = numpy.frombuffer(a, dtype=numpy.float64)
+        return v.reshape(n, n) if n else v
+
+    @staticmethod
+    def _arr(v) -> array:
+        return array('d', numpy.ascontiguousarray(v, dtype=numpy.float64).tobytes())
+
+    def add(self, a: array, b: array, out: Optional[array] = None) -> array:
+        if out is None:
+            return self._arr(self._np(a) + self._np(b))
+        numpy.add(self._np(a), self._np(b), out=self._np(out))
+        return out
+
+    def sub(self, a: array, b: array, out: Optional[array] = None) -> array:
+        if out is None:
+            return self._arr(self._np(a) - self._np(b))
+        numpy.subtract(self._np(a), self._np(b), out=self._np(out))
+        return out
+
+    def mul(self, a: array, b: array, out: Optional[array] = None) -> array:
+        if out is None:
+            return self._arr(self._np(a) * self._np(b))
+        numpy.multiply(self._np(a), self._np(b), out=self._np(out))
+        return out
+
+    def scale(self, a: array, s: float, out: Optional[array] = None) -> array:
+        if out is None:
+            return self._arr(self._np(a) * s)
+        numpy.multiply(self._np(a), s, out=self._np(out))
+        return out
+
+    def div(self, a: array, s: float, out: Optional[array] = None) -> array:
+        if out is None:
+            return self._arr(self._np(a) / s)
+        numpy.divide(self._np(a), s, out=self._np(out))
+        return out
+
+    def axpy(self, alpha: float, x: array, y: array) -> array:
+        v = self._np(y)
+        v += alpha * self._np(x)
+        return y
+
+    def sumsq(self, a: array) -> float:
+        v = self._np(a)
+        return float(v @ v)
+
+    def inner(self, a: array, b: array) -> float:
+        return float(self._np(a) @ self._np(b))
+
+    def matmul(self, a: array, b: array, n: int) -> array:
+        return self._arr(self._np(a, n) @ self._np(b, n))
+
+    def matvec(self, a: array, x: array, n: int, out: Optional[array] = None) -> array:
+        if out is None:
+            return self._arr(self._np(a, n) @ self._np(x))
+        numpy.matmul(self._np(a, n), self._np(x), out=self._np(out))
+        return out
+
+    def gemv(self, a: array, x: array, n: int, alpha: float, beta: float, y: Optional[array],
+             out: Optional[array] = None) -> array:
+        ax = self._np(a, n) @ self._np(x)
+        if out is None:
+            out = array('d', [0.]) * n
+        o = self._np(out)
+        if beta and y is not None:
+            numpy.multiply(self._np(y), beta, out=o)
+            if alpha != 1:
+                ax *= alpha
+            o += ax
+        else:
+            numpy.multiply(ax, alpha, out=o)
+        return out
+
+    def residualNorm(self, a: array, x: array, b: array, n: int) -> float:
+        r = self._np(a, n) @ self._np(x)
+        r -= self._np(b)
+        return float(r @ r) ** 0.5
+
+    def transpose(self, a: array, n: int) -> array:
+        return self._arr(self._np(a, n).T)
+
+    def outer(self, x: array, y: array) -> array:
+        return self._arr(numpy.outer(self._np(x), self._np(y)))
+
+    def reflect(self, a: array, n: int, k: int, w: array):
+        m = self._np(a, n)[k:, k:]
+        w = self._np(w)
+        m -= numpy.outer(w, (w @ m) * 2)
+
+    def eliminate(self, a: array, n: int, k: int):
+        m = self._np(a, n)
+        m[k+1:, k] /= m[k, k]
+        m[k+1:, k+1:] -= numpy.outer(m[k+1:, k], m[k, k+1:])
+
+    def cholesky(self, a: array, n: int) -> array:
+        # rows of L are found by blocks of `nb` rows and written straight into the packed result,
+        # so besides it only a block of nb x n values is allocated
+        m = self._np(a, n)
+        out = array('d', [0.]) * (n * (n + 1) // 2)
+        l = self._np(out)
+        nb = 64
+        for i0 in range(0, n, nb):
+            i1 = min(n, i0 + nb)
+            block = m[i0:i1, :i1].copy()
+            for j in range(i0):
+                lj = l[j*(j+1)//2:(j+1)*(j+2)//2]
+                block[:, j] = (block[:, j] - block[:, :j] @ lj[:j]) / lj[j]
+            for j in range(i0, i1):
+                r = j - i0
+                lj = block[r, :j]
+                s = block[r, j] - lj @ lj
+                if not s > 0:
+                    raise ValueError('matrix is not positive definite')
+                block[r, j] = s ** 0.5
+                block[r+1:, j] = (block[r+1:, j] - block[r+1:, :j] @ lj) / block[r, j]
+            for i in range(i0, i1):
+                l[i*(i+1)//2:(i+1)*(i+2)//2] = block[i - i0, :i+1]
+        return out
+
+    def luPanel(self, a: array, n: int, k0: int, k1: int) -> array:
+        m = self._np(a, n)
+        pivots = array('q')
+        for k in range(k0, k1):
+            p = k + int(numpy.argmax(numpy.abs(m[k:, k])))
+            if m[p, k] == 0:
+                raise ZeroDivisionError('matrix is singular')
+            pivots.append(p)
+            if p != k:
+                m[[k, p]] = m[[p, k]]
+            m[k+1:, k] /= m[k, k]
+            m[k+1:, k+1:k1] -= numpy.outer(m[k+1:, k], m[k, k+1:k1])
+        for k in range(k0, k1):
+            m[k+1:k1, k1:] -= numpy.outer(m[k+1:k1, k], m[k, k1:])
+        return pivots
+
+    def luUpdate(self, a: array, n: int, k0: int, k1: int, r0: int, r1: int):
+        m = self._np(a, n)
+        m[r0:r1, k1:] -= m[r0:r1, k0:k1] @ m[k0:k1, k1:]
+
+    def norm(self, a: array, n: int, t: int) -> float:
+        m = numpy.abs(self._np(a, n))
+        if t == 0:
+            return float(m.max())
+        elif t == 1:
+            return float(m.sum(axis=1).max())
+        elif t == 2:
+            return float(m.sum(axis=0).max())
+        elif t == 3:
+            return float(m.sum()) ** 0.5
+
+
+class CountingBackend:
+    '''
+    Backend passing every call to another one and counting matvecs, flops
+    and allocated result buffers into `SolveStats` (see `methods/stats.py`),
+    it is returned by `getBackend` while the instrumentation is on
+    '''
+    def __init__(self, backend, stats: SolveStats):
+        self.wrapped = backend
+        self.stats = stats
+
+    def _count(self, flops: int, allocated: int = 0, matvecs: int = 0):
+        stats = self.stats
+        stats.count('flops', flops)
+        if allocated:
+            stats.count('allocations')
+            stats.count('allocatedBytes', 8 * allocated)
+        if matvecs:
+            stats.count('matvecs', matvecs)
+
+    def add(self, a: array, b: array, out: Optional[array] = None) -> array:
+        self._count(len(a), len(a) if out is None else 0)
+        return self.wrapped.add(a, b, out)
+
+    def sub(self, a: array, b: array, out: Optional[array] = None) -> array:
+        self._count(len(a), len(a) if out is None else 0)
+        return self.wrapped.sub(a, b, out)
+
+    def mul(self, a: array, b: array, out: Optional[array] = None) -> array:
+        self._count(len(a), len(a) if out is None else 0)
+        return self.wrapped.mul(a, b, out)
+
+    def scale(self, a: array, s: float, out: Optional[array] = None) -> array:
+        self._count(len(a), len(a) if out is None else 0)
+        return self.wrapped.scale(a, s, out)
+
+    def div(self, a: array, s: float, out: Optional[array] = None) -> array:
+        self._count(len(a), len(a) if out is None else 0)
+        return self.wrapped.div(a, s, out)
+
+    def axpy(self, alpha: float, x: array, y: array) -> array:
+        self._count(2 * len(x))
+        return self.wrapped.axpy(alpha, x, y)
+
+    def sumsq(self, a: array) -> float:
+        self._count(2 * len(a))
+        return self.wrapped.sumsq(a)
+
+    def inner(self, a: array, b: array) -> float:
+        self._count(2 * len(a))
+        return self.wrapped.inner(a, b)
+
+    def matmul(self, a: array, b: array, n: int) -> array:
+        self._count(2 * n ** 3, n * n)
+        return self.wrapped.matmul(a, b, n)
+
+    def matvec(self, a: array, x: array, n: int, out: Optional[array] = None) -> array:
+        self._count(2 * n * n, n if out is None else 0, 1)
+        return self.wrapped.matvec(a, x, n, out)
+
+    def gemv(self, a: array, x: array, n: int, alpha: float, beta: float, y: Optional[array],
+             out: Optional[array] = None) -> array:
+        self._count(2 * n * n + 3 * n, n if out is None else 0, 1)
+        return self.wrapped.gemv(a, x, n, alpha, beta, y, out)
+
+    def residualNorm(self, a: array, x: array, b: array, n: int) -> float:
+        self._count(2 * n * n + 3 * n, 0, 1)
+        return self.wrapped.residualNorm(a, x, b, n)
+
+    def transpose(self, a: array, n: int) -> array:
+        self._count(0, n * n)
+        return self.wrapped.transpose(a, n)
+
+    def outer(self, x: array, y: array) -> array:
+        self._count(len(x) * len(y), len(x) * len(y))
+        return self.wrapped.outer(x, y)
+
+    def reflect(self, a: array, n: int, k: int, w: array):
+        self._count(4 * (n - k) ** 2)
+        return self.wrapped.reflect(a, n, k, w)
+
+    def eliminate(self, a: array, n: int, k: int):
+        m = n - k - 1
+        self._count(m + 2 * m * m)
+        return self.wrapped.eliminate(a, n, k)
+
+    def cholesky(self, a: array, n: int) -> array:
+        self._count(n ** 3 // 3 + n * n, n * (n + 1) // 2)
+        return self.wrapped.cholesky(a, n)
+
+    def luPanel(self, a: array, n: int, k0: int, k1: int) -> array:
+        self._count(sum((n - k - 1) * (1 + 2 * (k1 - k - 1)) + 2 * (k1 - k - 1) * (n - k1) for k in range(k0, k1)))
+        return self.wrapped.luPanel(a, n, k0, k1)
+
+    def luUpdate(self, a: array, n: int, k0: int, k1: int, r0: int, r1: int):
+        self._count(2 * (r1 - r0) * (k1 - k0) * (n - k1))
+        return self.wrapped.luUpdate(a, n, k0, k1, r0, r1)
+
+    def norm(self, a: array, n: int, t: int) -> float:
+        self._count(len(a))
+        return self.wrapped.norm(a, n, t)
+
+
+
+_backends: Dict[str, type] = {'python': PythonBackend}
+if numpy is not None:
+    _backends['numpy'] = NumpyBackend
+
+_current = _backends['numpy' if numpy is not None else 'python']()
+
+
+def getBackend():
+    '''
+    Returns the backend currently used by `Matrix` and `Vector`
+    (wrapped into `CountingBackend` while the instrumentation is on)
+    '''
+    stats = currentStats()
+    if stats is None:
+        return _current
+    if stats.backend is None or stats.backend.wrapped is not _current:
+        stats.backend = CountingBackend(_current, stats)
+    return stats.backend
+
+def setBackend(name: str):
+    '''
+    Selects the backend used by `Matrix` and `Vector`
+
+    params
+    ------
+    name: str
+        'python' or 'numpy' (requires installed numpy)
+    '''
+    global _current
+    if name not in _backends:
+        raise ValueError(f'backend {name!r} is not available, choose from {list(_backends)}')
+    _current = _backends[name]()
@@ -0,0 +1,181 @@
+'''
+Batch
+=====
+Solution of many independent systems on a pool of processes.
+The solvers are pure Python and hold the GIL, so unrelated systems
+are distributed across worker processes. Systems are sent in chunks
+to amortize pickling of the matrices.
+'''
+
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from os import cpu_count
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .Cholesky import CholeskySolve
+from .FixedPointIteration import IterationSolve
+from .Krylov import BiCGSTABSolve, CGSolve, GMRESSolve
+from .LU import SolveLU
+from .QR import QRSolve
+from .Seildel import SeidelSolve
+from .banded import BandedMatrix
+from .convergence import ConvergenceException
+from .dispatch import solve
+from .matrix import Matrix
+from .sparse import SparseMatrix
+from .vector import Vector
+
+# name -> (solver, whether it takes eps)
+_methods = {
+    'auto': (solve, True),
+    'lu': (SolveLU, False),
+    'qr': (QRSolve, False),
+    'cholesky': (CholeskySolve, False),
+    'seidel': (SeidelSolve, True),
+    'iteration': (IterationSolve, True),
+    'cg': (CGSolve, True),
+    'gmres': (GMRESSolve, True),
+    'bicgstab': (BiCGSTABSolve, True),
+}
+
+Method = Union[str, Callable]
+System = Tuple[Matrix, Sequence[float]]
+Record = object  # a JSON line (bytes) or a system (A, b)
+
+
+def _resolve(method: Method) -> Tuple[Callable, bool]:
+    if callable(method):
+        return method, True
+    if method not in _methods:
+        raise ValueError(f'unknown method {method!r}, choose from {list(_methods)}')
+    return _methods[method]
+
+def _solveChunk(method: Method, chunk: List[System], eps: float, returnExceptions: bool, kwargs: dict) -> list:
+    '''
+    Solves a chunk of systems in a worker process
+    '''
+    f, withEps = _resolve(method)
+    results = []
+    for A, b in chunk:
+        try:
+            results.append(f(A, b, eps, **kwargs) if withEps else f(A, b, **kwargs))
+        except Exception as e:
+            if not returnExceptions:
+                raise
+            results.append(e)
+    return results
+
+
+def iterBatch(systems: Iterable[System], method: Method = 'lu', eps: float = 1e-6, workers: Optional[int] = None,
+              chunkSize: Optional[int] = None, returnExceptions: bool = False,
+              executor: Optional[Executor] = None, **kwargs) -> Iterator[Tuple[int, object]]:
+    '''
+    Solves independent systems on a process pool and yields results as they are completed
+
+    params
+    ------
+    systems: Iterable[(Matrix, Vector | List[float])]
+        systems `A*x = b` given as pairs (A, b)
+    method: str | Callable
+        'auto' (`dispatch.solve`), 'lu', 'qr', 'cholesky', 'seidel', 'iteration', 'cg', 'gmres', 'bicgstab' or a picklable
+        module level function called as `method(A, b, eps, **kwargs)`
+    eps: float
+        required error of the iterative methods
+    workers: int | None
+        number of processes (all cores if None), 1 - solve in the current process
+    chunkSize: int | None
+        number of systems sent to a worker at once, by default the systems
+        are split into about four chunks per worker
+    returnExceptions: bool
+        put the exception of a failed system in place of its result instead of raising it
+    executor: Executor | None
+        existing pool to use instead of creating a new one
+    kwargs:
+        additional arguments of the method (e.g. `criteria`, `omega`)
+
+    returns iterator of pairs (index of system, result of method)
+    '''
+    _resolve(method)
+    systems = list(systems)
+    workers = workers or cpu_count() or 1
+    if chunkSize is None:
+        chunkSize = max(1, -(-len(systems) // (4 * workers)))
+    chunks = [(i, systems[i:i + chunkSize]) for i in range(0, len(systems), chunkSize)]
+    if executor is None and workers == 1:
+        for start, chunk in chunks:
+            for i, r in enumerate(_solveChunk(method, chunk, eps, returnExceptions, kwargs), start):
+                yield i, r
+        return
+    pool = executor or ProcessPoolExecutor(workers)
+    try:
+        futures = {pool.submit(_solveChunk, method, chunk, eps, returnExceptions, kwargs): start for start, chunk in chunks}
+        for future in as_completed(futures):
+            for i, r in enumerate(future.result(), futures[future]):
+                yield i, r
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+def SolveBatch(systems: Iterable[System], method: Method = 'lu', eps: float = 1e-6, workers: Optional[int] = None,
+               chunkSize: Optional[int] = None, returnExceptions: bool = False,
+               executor: Optional[Executor] = None, **kwargs) -> list:
+    '''
+    Solves independent systems on a process pool, params are the same as of `iterBatch`
+
+    returns list of results of method in the order of systems
+    '''
+    results = []
+    for i, r in iterBatch(systems, method, eps, workers, chunkSize, returnExceptions, executor, **kwargs):
+        results.extend([None] * (i + 1 - len(results)))
+        results[i] = r
+    return results
+
+
+def parseSystem(d: dict):
+    '''
+    System (A, b) described by a parsed JSON object, see the format in `methods/__main__.py`
+    '''
+    A = d['A']
+    if isinstance(A, list):
+        A = Matrix(A)
+    elif 'diagonals' in A:
+        A = BandedMatrix.fromDiagonals(A['n'], {int(k): v for k, v in A['diagonals'].items()})
+    else:
+        A = SparseMatrix.fromCOO(A['n'], A['rows'], A['cols'], A['vals'])
+    return A, Vector.fromIterable(d['b'])
+
+def solveRecord(index: int, record: Record, method: str = 'auto', eps: Optional[float] = None) -> dict:
+    '''
+    Parses and solves one system of the command line or of the solve server. Failures are
+    returned as results with status 'error' (or the status of `ConvergenceException`)
+
+    returns dictionary with 'id', 'status', 'x' (Vector), 'method', 'iterations', 'time' and 'error'
+    '''
+    start = perf_counter()
+    result = {'id': index, 'status': 'ok', 'x': None, 'method': method, 'iterations': None, 'n': None}
+    try:
+        if isinstance(record, (bytes, str)):
+            d = json.loads(record)
+            result['id'] = d.get('id', index)
+            A, b = parseSystem(d)
+            method, eps = d.get('method', method), d.get('eps', eps)
+        elif isinstance(record, tuple) and len(record) == 2:
+            A, b = record
+        else:
+            raise ValueError(f'record is not a system but {type(record).__name__}')
+        result['method'], result['n'] = method, len(b)
+        f, withEps = _resolve(method)
+        if not withEps and not isinstance(A, Matrix):
+            A = A.toDense()  # direct methods work with dense matrices only
+        r = f(A, b, 1e-6 if eps is None and method != 'auto' else eps) if withEps else f(A, b)
+        if isinstance(r, tuple):
+            r, extra = r
+            result['method' if isinstance(extra, str) else 'iterations'] = extra
+        result['x'] = r
+    except ConvergenceException as e:
+        result.update(status=e.status, iterations=e.k, error=str(e))
+    except Exception as e:
+        result.update(status='error', error=f'{type(e).__name__}: {e}')
+    result['time'] = perf_counter() - start
+    return result
@@ -0,0 +1,151 @@
+'''
+Cache
+=====
+Cache of matrix decompositions. Solving many systems with the same
+matrix, the decomposition is computed once and then taken from the
+cache. Entries are found by a hash of matrix elements (or an explicit
+key) and evicted in least recently used order when the entry or the
+memory budget is exceeded.
+'''
+
+from array import array
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import Lock
+from typing import Callable, Hashable, Optional, Union
+
+from .matrix import Matrix, Permutation
+from .sparse import SparseMatrix
+from .utility import Factorization
+
+
+def fingerprint(A: Union[Matrix, SparseMatrix, 'BandedMatrix']) -> str:
+    '''
+    Hash of the matrix contents. Equal matrices have equal fingerprints
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
+        matrix to hash
+    '''
+    h = blake2b(digest_size=16)
+    h.update(len(A).to_bytes(8, 'little'))
+    if isinstance(A, SparseMatrix):
+        h.update(b'sparse')
+        for buf in (A.indptr, A.indices, A.values):
+            h.update(memoryview(buf))
+        return h.hexdigest()
+    if not isinstance(A, Matrix):  # BandedMatrix, not imported as it depends on this module
+        h.update(b'banded' + A.lower.to_bytes(8, 'little') + A.upper.to_bytes(8, 'little'))
+    h.update(memoryview(A.data))
+    return h.hexdigest()
+
+def nbytes(obj) -> int:
+    '''
+    Approximate memory held by buffers of a decomposition (matrices, arrays, lists of them)
+    '''
+    if isinstance(getattr(obj, 'data', None), (array, memoryview)):
+        return nbytes(obj.data)
+    if isinstance(obj, Permutation):
+        return nbytes(obj.perm)
+    if isinstance(obj, (array, memoryview)):
+        return len(obj) * obj.itemsize
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(i) for i in obj)
+    if isinstance(obj, Factorization):
+        return sum(nbytes(i) for i in vars(obj).values())
+    return 0
+
+
+class FactorizationCache:
+    '''
+    LRU cache of decompositions
+
+    params
+    ------
+    maxEntries: int
+        maximum number of stored decompositions
+    maxBytes: int | None
+        maximum memory taken by stored decompositions (None - unlimited)
+
+    attributes
+    ----------
+    hits: int
+        number of requests answered from the cache
+    misses: int
+        number of requests that computed a new decomposition
+    evictions: int
+        number of decompositions removed to fit the budget
+    '''
+    def __init__(self, maxEntries: int = 16, maxBytes: Optional[int] = None):
+        assert maxEntries > 0
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries: 'OrderedDict[Hashable, tuple[Factorization, int]]' = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, A: Matrix, factory: Callable[[Matrix], Factorization], key: Optional[Hashable] = None) -> Factorization:
+        '''
+        Returns decomposition of the matrix, computing it with `factory` if it is not cached
+
+        params
+        ------
+        A: Matrix
+            matrix of system
+        factory: Callable[[Matrix], Factorization]
+            decomposition class, e.g. `LUFactorization` or `QRFactorization`
+        key: Hashable | None
+            explicit key of the matrix, if None the fingerprint of the matrix is used
+        '''
+        k = (factory, fingerprint(A) if key is None else key)
+        f = self.lookup(factory, k[1])
+        if f is not None:
+            return f
+        with self._lock:
+            self.misses += 1
+        f = factory(A)
+        size = nbytes(f)
+        with self._lock:
+            if self.maxBytes is not None and size > self.maxBytes:
+                return f
+            if k in self._entries:
+                self.bytes -= self._entries.pop(k)[1]
+            self._entries[k] = (f, size)
+            self.bytes += size
+            while len(self._entries) > self.maxEntries or \
+                    self.maxBytes is not None and self.bytes > self.maxBytes:
+                _, (_, s) = self._entries.popitem(last=False)
+                self.bytes -= s
+                self.evictions += 1
+        return f
+
+    def lookup(self, factory: Callable[[Matrix], Factorization], key: Hashable) -> Optional[Factorization]:
+        '''
+        Returns the cached decomposition of the matrix with the key (a fingerprint or an
+        explicit key given to `get`) or None, the matrix itself is not needed
+        '''
+        with self._lock:
+            entry = self._entries.get((factory, key))
+            if entry is None:
+                return None
+            self._entries.move_to_end((factory, key))
+            self.hits += 1
+            return entry[0]
+
+    def clear(self):
+        '''
+        Removes all decompositions, counters are kept
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return f'FactorizationCache(entries={len(self)}, bytes={self.bytes}, hits={self.hits}, misses={self.misses}, evictions={self.evictions})'
@@ -0,0 +1,180 @@
+'''
+Convergence
+===========
+Stopping criteria of the iterative methods. A solver creates a
+`Monitor` and asks it after every sweep whether the iterations are
+finished. Iterations that cannot reach the required error end with
+`ConvergenceException` describing what happened.
+'''
+
+from math import isfinite
+from time import perf_counter
+from typing import Callable, Optional
+
+from .matrix import residualNorm
+from .stats import SolveStats, currentStats
+from .vector import Vector
+
+
+class ConvergenceException(Exception):
+    '''
+    Exception reporting that an iterative method did not converge
+
+    status: str
+        'maxiter' - iteration limit reached,
+        'diverged' - residual grew too much or became infinite,
+        'stagnated' - residual stopped decreasing,
+        'breakdown' - the method can not continue (e.g. division by zero)
+    x: Vector
+        last approximation
+    k: int
+        number of done iterations
+    residual: float
+        last computed residual norm `|A*x - b|`
+    '''
+    def __init__(self, status: str, x: Vector, k: int, residual: float):
+        super().__init__(status, x, k, residual)
+        self.status = status
+        self.x = x
+        self.k = k
+        self.residual = residual
+        self.message = f'{status} after {k} iterations, residual {residual}'
+    def __str__(self):
+        return self.message
+
+
+class StoppingCriteria:
+    '''
+    Settings of the iterations stopping. The iterations stop when
+    `|A*x - b| <= max(eps, rtol*|b|)`
+
+    params
+    ------
+    rtol: float
+        required residual relative to the free vector norm
+    maxIter: int
+        maximum number of iterations
+    checkEvery: int
+        residual is computed only every `checkEvery` iterations
+    updateTol: float | None
+        if set, iterations also stop when the update norm `|x_k+1 - x_k|`
+        is not greater than it. It costs O(n) instead of O(n^2) of the residual
+    stagnation: int
+        number of residual checks without decrease of the least residual after which
+        iterations are stagnated (diverged if the residual is above the initial one)
+    divergence: float
+        iterations diverged if the residual is greater than the initial one this many times
+    '''
+    def __init__(self, rtol: float = 0., maxIter: int = 100000, checkEvery: int = 1,
+                 updateTol: Optional[float] = None, stagnation: int = 1000, divergence: float = 1e8):
+        assert maxIter > 0 and checkEvery > 0 and stagnation > 0
+        self.rtol = rtol
+        self.maxIter = maxIter
+        self.checkEvery = checkEvery
+        self.updateTol = updateTol
+        self.stagnation = stagnation
+        self.divergence = divergence
+
+
+class Monitor:
+    '''
+    Follows the iterations of one solution according to `StoppingCriteria`
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system the iterations are done for
+    b: Vector
+        Free vector of the system
+    eps: float
+        Required residual norm
+    criteria: StoppingCriteria | None
+        stopping settings, default ones if None
+    onIteration: Callable[[int, Vector, float | None], None] | None
+        called after every iteration with its number, the current approximation
+        (changed in place by some methods, copy it to keep) and the residual norm
+        if it was computed on this iteration (None otherwise)
+    '''
+    def __init__(self, A, b: Vector, eps: float, criteria: Optional[StoppingCriteria] = None,
+                 onIteration: Optional[Callable[[int, Vector, Optional[float]], None]] = None):
+        self.A = A
+        self.b = b
+        self.criteria = criteria or StoppingCriteria()
+        self.tol = max(eps, self.criteria.rtol * b.abs())
+        self.residual = float('inf')
+        self.initial: Optional[float] = None
+        self.best = float('inf')
+        self.unimproved = 0
+        self.onIteration = onIteration
+        self.checked = -1
+        self.started: Optional[float] = None
+
+    @property
+    def needsUpdate(self) -> bool:
+        '''
+        Whether the solver should pass update norms to `done`
+        '''
+        return self.criteria.updateTol is not None
+
+    def done(self, k: int, x: Vector, update: Optional[float] = None, residual: Optional[float] = None) -> bool:
+        '''
+        Checks the approximation after k iterations
+
+        params
+        ------
+        k: int
+            number of done iterations
+        x: Vector
+            current approximation
+        update: float | None
+            norm of the last update `|x_k - x_k-1|`
+        residual: float | None
+            residual norm if the method already knows it (otherwise `|A*x - b|` is computed)
+
+        returns True if the required error is reached, raises `ConvergenceException` if it never will be
+        '''
+        stats = currentStats()
+        if stats is not None and self.started is None:
+            self.started = perf_counter()
+        try:
+            finished = self._check(k, x, update, residual)
+        except ConvergenceException:
+            self._report(stats, k, x, True)
+            raise
+        self._report(stats, k, x, finished)
+        return finished
+
+    def _report(self, stats: Optional[SolveStats], k: int, x: Vector, finished: bool):
+        if k and self.onIteration is not None:
+            self.onIteration(k, x, self.residual if self.checked == k else None)
+        if finished and stats is not None and self.started is not None:
+            stats.addTime('iterations', perf_counter() - self.started)
+            stats.iterations = k
+            stats.residual = self.residual
+
+    def _check(self, k: int, x: Vector, update: Optional[float], residual: Optional[float]) -> bool:
+        c = self.criteria
+        if update is not None and not isfinite(update):
+            raise ConvergenceException('diverged', x, k, self.residual)
+        if update is not None and c.updateTol is not None and update <= c.updateTol:
+            return True
+        if k % c.checkEvery == 0 or k >= c.maxIter:
+            r = residualNorm(self.A, x, self.b) if residual is None else residual
+            self.residual = r
+            self.checked = k
+            if r <= self.tol:
+                return True
+            if self.initial is None:
+                self.initial = r
+            if not isfinite(r) or r > c.divergence * self.initial:
+                raise ConvergenceException('diverged', x, k, r)
+            if r < self.best:
+                self.best = r
+                self.unimproved = 0
+            else:
+                self.unimproved += 1
+                if self.unimproved >= c.stagnation:
+                    raise ConvergenceException('diverged' if r > self.initial else 'stagnated', x, k, r)
+        if k >= c.maxIter:
+            raise ConvergenceException('maxiter', x, k, self.residual)
+        return False
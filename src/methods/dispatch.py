@@ -0,0 +1,143 @@
+'''
+Dispatch
+========
+`solve` looks at the structure of the system matrix and picks the
+cheapest method able to solve the system. The inspection is cheap:
+bandwidths are found by scanning every row only up to its first and
+from its last nonzero element, symmetry is checked only for matrices
+that are not triangular or tridiagonal. Sparse matrices (and dense ones
+of at least `SPARSE_SIZE` rows with at most `SPARSE_DENSITY` of nonzero
+elements) are never densified, they are solved by iterative methods.
+'''
+
+from array import array
+from typing import List, Optional, Tuple, Union
+
+from .Cholesky import CholeskySolve
+from .banded import BandedMatrix, BandedSolve
+from .Krylov import CGSolve, GMRESSolve
+from .LU import SolveLU
+from .Seildel import SeidelSolve
+from .convergence import ConvergenceException
+from .matrix import Matrix, ShapeException, isDiagonallyDominant, isSymmetric
+from .sparse import SparseMatrix
+from .utility import BotDiagSolve, ThomasSolve, TopDiagSolve
+from .vector import Vector
+
+# tolerance of the iterative methods for sparse matrices when eps is not given
+DEFAULT_EPS = 1e-10
+# dense matrices of at least this size and at most this fraction of nonzero elements are solved as sparse ones
+SPARSE_SIZE = 100
+SPARSE_DENSITY = 0.1
+
+
+def bandwidths(A: Union[Matrix, SparseMatrix, BandedMatrix]) -> Tuple[int, int]:
+    '''
+    Lower and upper bandwidths of the matrix: the greatest `i - j`
+    and `j - i` over its nonzero elements `a_ij`
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
+        matrix to inspect
+    '''
+    lower = upper = 0
+    for i in range(len(A)):
+        cols, vals = A.rowItems(i)
+        first = next((j for j, v in zip(cols, vals) if v), None)
+        if first is None:
+            continue
+        last = next(j for j, v in zip(reversed(cols), reversed(vals)) if v)
+        lower = max(lower, i - first)
+        upper = max(upper, last - i)
+    return lower, upper
+
+def _triangularSolve(A: Union[SparseMatrix, BandedMatrix], b: Vector, lower: bool) -> Vector:
+    n = len(A)
+    x = array('d', [0.]) * n
+    for i in (range(n) if lower else range(n - 1, -1, -1)):
+        s = b[i]
+        d = 0.
+        for j, v in zip(*A.rowItems(i)):
+            if j == i:
+                d = v
+            else:
+                s -= v * x[j]
+        x[i] = s / d
+    return Vector.fromBuffer(x)
+
+def solve(A: Union[Matrix, SparseMatrix, BandedMatrix], b: Union[Vector, List[float]], eps: Optional[float] = None):
+    '''
+    Solves the system `A*x = b` choosing the method by the matrix structure:
+
+    'diagonal' - division by the diagonal, O(n)
+    'upper triangular', 'lower triangular' - back (forward) substitution, O(n^2) (O(nnz) for a sparse or band matrix)
+    'thomas' - Thomas algorithm for tridiagonal matrices, O(n)
+    'banded lu' - LU decomposition of a `BandedMatrix`, O(n*lower*(lower + upper))
+    'cholesky' - Cholesky decomposition for symmetric positive definite matrices, O(n^3/3)
+    'seidel' - Seidel method for diagonally dominant matrices, only if eps is given
+    'cg' - conjugate gradients for sparse symmetric matrices with positive diagonal
+    'gmres' - GMRES for other sparse matrices
+    'lu' - LU decomposition with partial pivoting otherwise, O(2n^3/3)
+
+    Dense matrices of at least `SPARSE_SIZE` rows with at most `SPARSE_DENSITY`
+    of nonzero elements are converted to `SparseMatrix`. Sparse matrices are not
+    densified, they are solved by 'cg' or 'gmres' with `DEFAULT_EPS` if eps is not given
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
+        matrix of system
+    b: Vector | List[float]
+        free vector of system
+    eps: float | None
+        allowed error of the solution, iterative methods are considered for dense matrices only if it is given
+
+    raises `ConvergenceException` if GMRES does not reach the required error for a sparse matrix
+
+    returns
+    -------
+    x: Vector
+        solution vector
+    method: str
+        name of the chosen method
+    '''
+    assert len(A) == len(b), ShapeException(len(A), len(b))
+    b = Vector.fromIterable(b)
+    n = len(A)
+    sparse = isinstance(A, SparseMatrix)
+    dense = isinstance(A, Matrix)
+    lower, upper = bandwidths(A)
+    if lower == upper == 0:
+        return Vector.fromBuffer(array('d', [bi / d for bi, d in zip(b, A.diagonal())])), 'diagonal'
+    if lower == 0:
+        return (TopDiagSolve(A, b) if dense else _triangularSolve(A, b, False)), 'upper triangular'
+    if upper == 0:
+        return (BotDiagSolve(A, b) if dense else _triangularSolve(A, b, True)), 'lower triangular'
+    if lower == upper == 1:
+        try:
+            return ThomasSolve([A[i+1, i] for i in range(n - 1)], A.diagonal(),
+                               [A[i, i+1] for i in range(n - 1)], b), 'thomas'
+        except ZeroDivisionError:
+            pass
+    if isinstance(A, BandedMatrix):
+        return BandedSolve(A, b), 'banded lu'
+    if dense and n >= SPARSE_SIZE and sum(1 for v in A.data if v) <= SPARSE_DENSITY * n * n:
+        A = SparseMatrix.fromDense(A)
+        sparse = True
+    if eps is not None and isDiagonallyDominant(A):
+        return SeidelSolve(A, b, eps)[0], 'seidel'
+    if sparse:
+        eps = DEFAULT_EPS if eps is None else eps
+        if all(d > 0 for d in A.diagonal()) and isSymmetric(A):
+            try:
+                return CGSolve(A, b, eps)[0], 'cg'
+            except ConvergenceException:
+                pass
+        return GMRESSolve(A, b, eps)[0], 'gmres'
+    if all(d > 0 for d in A.diagonal()) and isSymmetric(A):
+        try:
+            return CholeskySolve(A, b), 'cholesky'
+        except ValueError:
+            pass
+    return SolveLU(A, b), 'lu'
@@ -1,47 +1,123 @@
 '''
 Matrix
 ======
-A module implementing a class of a square matrix 
-with the necessary methods (classes) and functions 
+A module implementing a class of a square matrix
+with the necessary methods (classes) and functions
 for solving linear systems
 '''
 
-from typing import List, Union, overload
-from copy import deepcopy
+from array import array
+from operator import mul
+from typing import Iterable, List, Optional, Tuple, Union, overload
 
-from .vector import Vector
+from .backend import getBackend
+from .vector import Vector, VectorView, _buffer
 
 class ShapeException(Exception):
     '''Exception reporting size mismatch
-      
+
     shape1: int
         size of first object
-    shape2: int 
+    shape2: int
         size of second object
     '''
     def __init__(self, shape1: int, shape2: int):
+        super().__init__(shape1, shape2)
         self.message = f'shapes incompatible ({shape1}, {shape2})'
     def __str__(self):
         return self.message
 
 class Matrix:
     '''
-    A class of a square matrix encapsulating 
-    a square array and methods of working with 
-    it, as well as some things are necessary for 
+    A class of a square matrix encapsulating
+    a square array and methods of working with
+    it, as well as some things are necessary for
     solving linear systems by implemented methods
+
+    Elements are stored row by row in one contiguous
+    `array('d')` buffer: element `(i, j)` lives at `data[i*size + j]`
     '''
-    def __init__(self, i: List[List[float]]):
+    __slots__ = ('data', 'size')
+
+    def __init__(self, i: Union[List[List[float]], 'Matrix']):
         '''
         params
         ------
-        i: List[List[float]]
+        i: List[List[float]] | Matrix
             square array initializing the matrix
         '''
+        if isinstance(i, Matrix):
+            self.data = array('d', i.data)
+            self.size = i.size
+            return
         assert len(i)
         assert len(i) == len(i[0])
-        self.matrix = deepcopy(i)
-        self.size = len(i)
+        n = len(i)
+        data = array('d')
+        for row in i:
+            assert len(row) == n, ShapeException(n, len(row))
+            data.extend(row)
+        self.data = data
+        self.size = n
+
+    @staticmethod
+    def fromBuffer(data: array, n: int) -> 'Matrix':
+        '''
+        Wraps an existing row-major buffer of doubles into a matrix without copying it
+
+        params
+        ------
+        data: array('d') | memoryview
+            buffer of `n*n` elements (e.g. a memory-mapped file, see `methods/storage.py`)
+        n: int
+            size of matrix
+        '''
+        assert len(data) == n * n, ShapeException(len(data), n * n)
+        m = Matrix.__new__(Matrix)
+        m.data = data
+        m.size = n
+        return m
+
+    @property
+    def matrix(self) -> List[List[float]]:
+        '''
+        Matrix elements as a list of rows (a new nested list)
+        '''
+        n = self.size
+        d = self.data
+        return [d[i*n:(i+1)*n].tolist() for i in range(n)]
+
+    def row(self, i: int) -> array:
+        '''
+        Buffer with the copy of i'th row of the matrix
+        '''
+        n = self.size
+        return self.data[i*n:(i+1)*n]
+
+    def rowItems(self, i: int) -> tuple[range, array]:
+        '''
+        Columns and values of i'th row elements (the same interface as `SparseMatrix.rowItems`)
+        '''
+        return range(self.size), self.row(i)
+
+    def rowDot(self, i: int, x: array) -> float:
+        '''
+        Product of i'th row by the vector buffer x
+        '''
+        n = self.size
+        return sum(map(mul, self.data[i*n:(i+1)*n], x))
+
+    def diagonal(self) -> array:
+        '''
+        Buffer with diagonal elements
+        '''
+        return self.data[::self.size+1]
+
+    def copy(self) -> 'Matrix':
+        '''
+        Copy of matrix
+        '''
+        return Matrix.fromBuffer(array('d', self.data), self.size)
 
     def abs(self, t: int = 0) -> float:
         '''
@@ -49,50 +125,20 @@ class Matrix:
 
         params
         ------
-        t: int (from 0 to 3)  
-
-        Type of norm  
-
-        0 - Max norm. 
-            (max(a_ij), a_ij <= A)  
-        1 - p-1 vector norm 
-            (max_i(Sum_0^n(a_ij)))  
-        2 - p-inf norm 
-            (max_j(Sum_0^n(a_ij)))  
-        3 - euclyd norm 
-            sum(a_ij) ^ 0.5  
-        '''
-        if t == 0:
-            s = 0.
-            for i in self.matrix:
-                for j in i:
-                    if abs(j) > s:
-                        s = abs(j)
-            return s
-        elif t == 1:
-            s = 0
-            for i in self.matrix:
-                sj = 0
-                for j in i:
-                    sj += abs(j)
-                if sj > s:
-                    s = sj
-            return s
-        elif t == 2:
-            s = 0
-            for i in self.T:
-                sj = 0
-                for j in i:
-                    sj += abs(j)
-                if sj > s:
-                    s = sj
-            return s
-        elif t == 3:
-            s = 0
-            for i in self.matrix:
-                for j in i:
-                    s += abs(j)
-            return s ** 0.5
+        t: int (from 0 to 3)
+
+        Type of norm
+
+        0 - Max norm.
+            (max(a_ij), a_ij <= A)
+        1 - p-1 vector norm
+            (max_i(Sum_0^n(a_ij)))
+        2 - p-inf norm
+            (max_j(Sum_0^n(a_ij)))
+        3 - euclyd norm
+            sum(a_ij) ^ 0.5
+        '''
+        return getBackend().norm(self.data, self.size, t)
 
     def swap(self, i: int, j: int):
         '''
@@ -105,7 +151,12 @@ class Matrix:
         j: int
             second row
         '''
-        self.matrix[i], self.matrix[j] = self.matrix[j], self.matrix[i]
+        if i == j:
+            return
+        n = self.size
+        d = self.data
+        # copies, slices of a memoryview buffer would change with it
+        d[i*n:(i+1)*n], d[j*n:(j+1)*n] = array('d', d[j*n:(j+1)*n]), array('d', d[i*n:(i+1)*n])
 
     def extend(self, n: int) -> 'Matrix':
         '''
@@ -115,70 +166,90 @@ class Matrix:
         params
         ------
         n: int
-            new shape 
+            new shape
         '''
         d = n - self.size
         assert d >= 0, 'n less then matrix size!'
         new_m = eye(n)
-        for i in range(n):
-            if i < d:
-                continue
-            for j in range(n):
-                if j < d:
-                    continue
-                new_m[i,j] = self.matrix[i-d][j-d]
+        for i in range(d, n):
+            new_m.data[i*n+d:(i+1)*n] = array('d', self.row(i-d))
         return new_m
 
     @property
     def T(self): # yep, numpy style
         '''
-        Matrix transposing. Returns new matrix. 
+        Matrix transposing. Returns new matrix.
         '''
-        return Matrix([[self.matrix[i][j] for i in range(self.size)] for j in range(self.size)])
+        return Matrix.fromBuffer(getBackend().transpose(self.data, self.size), self.size)
+
+    def _layout(self) -> Tuple[array, int, int, int]:
+        '''
+        Buffer, offset of the first element, distances between rows and between columns
+        '''
+        return self.data, 0, self.size, 1
 
     @overload
-    def __getitem__(self, pos: int) -> Vector: ...
+    def __getitem__(self, pos: int) -> VectorView: ...
 
     @overload
     def __getitem__(self, pos: tuple[int, int]) -> float: ...
 
     @overload
-    def __getitem__(self, pos: slice) -> 'Matrix': ...
+    def __getitem__(self, pos: slice) -> 'MatrixView': ...
+
+    @overload
+    def __getitem__(self, pos: tuple[slice, int]) -> VectorView: ...
+
+    @overload
+    def __getitem__(self, pos: tuple[int, slice]) -> VectorView: ...
 
     @overload
-    def __getitem__(self, pos: tuple[slice, int]) -> Vector: ...
+    def __getitem__(self, pos: tuple[slice, slice]) -> 'MatrixView': ...
 
     def __getitem__(self, pos: Union[tuple[int, int], int]):
         '''
-        Getting an element of a matrix, its row or column
+        Getting an element of a matrix, its row or column.
+        Rows, columns and submatrices are views: they read and write
+        the elements of this matrix, use `copy` to get independent ones
         params combination
         ------------------
         pos: tuple[int, int]
             return matrix element with `pos[0]` and `pos[1]` indexes
         pos: tuple[slice, int]
-            return matrix column with `pos[1]` index
-        pos: int
-            return matrix row with `pos` index
+            return view of matrix column with `pos[1]` index
+        pos: tuple[int, slice] | int
+            return view of matrix row with `pos[0]` (`pos`) index
+        pos: slice
+            return view of submatrix with rows and columns selected by `pos`
+        pos: tuple[slice, slice]
+            return view of submatrix with selected rows and columns (of the same number)
         '''
+        n = self.size
+        base, offset, rs, cs = self._layout()
         if isinstance(pos, tuple):
             i, j = pos
+            if isinstance(i, slice) and isinstance(j, slice):
+                rows, cols = range(n)[i], range(n)[j]
+                assert len(rows) == len(cols), ShapeException(len(rows), len(cols))
+                if not rows:
+                    return MatrixView(base, offset, 0, rs, cs)
+                return MatrixView(base, offset + rows.start*rs + cols.start*cs, len(rows), rows.step*rs, cols.step*cs)
             if isinstance(i, slice):
-                v = Vector(self.size)
-                for i in range(self.size):
-                    v[i] = self.matrix[i][j]
-                return v
-            else:
-                assert i < self.size
-                assert j < self.size
-                return self.matrix[i][j]
+                assert 0 <= j < n
+                rows = range(n)[i]
+                return VectorView(base, offset + (rows.start if rows else 0)*rs + j*cs, len(rows), rows.step*rs)
+            assert 0 <= i < n
+            if isinstance(j, slice):
+                return VectorView(base, offset + i*rs, n, cs)[j]
+            assert 0 <= j < n
+            return base[offset + i*rs + j*cs]
         elif isinstance(pos, slice):
-            vecs = self.matrix[pos]
-            for i in range(len(vecs)):
-                vecs[i] = vecs[i][pos]
-            return Matrix(vecs)
+            return self[pos, pos]
         else:
-            return Vector.fromIterable(self.matrix[pos])
-    
+            if not -n <= pos < n:
+                raise IndexError('matrix row index out of range')
+            return VectorView(base, offset + (pos % n)*rs, n, cs)
+
     def __setitem__(self, pos: tuple[int, int], v: float):
         '''
         Set matrix element value.
@@ -189,31 +260,32 @@ class Matrix:
             inexes of element
         '''
         i,j = pos
-        assert i < self.size
-        assert j < self.size
-        self.matrix[i][j] = v
+        n = self.size
+        assert 0 <= i < n
+        assert 0 <= j < n
+        base, offset, rs, cs = self._layout()
+        base[offset + i*rs + j*cs] = v
+
+    def __iter__(self):
+        '''
+        Iterates over views of matrix rows
+        '''
+        for i in range(self.size):
+            yield self[i]
 
     def __sub__(self, other: 'Matrix'):
         '''
         Piecemeal subtracts the values of matrix elements
         '''
         assert self.size == other.size, ShapeException(self.size, other.size)
-        r = zeros(self.size)
-        for i in range(self.size):
-            for j in range(self.size):
-                r[i,j] = self.matrix[i][j] - other[i, j]
-        return r
-    
+        return Matrix.fromBuffer(getBackend().sub(self.data, other.data), self.size)
+
     def __add__(self, other: 'Matrix'):
         '''
         Piecemeal adds the values of matrix elements
         '''
         assert self.size == other.size, ShapeException(self.size, other.size)
-        r = zeros(self.size)
-        for i in range(self.size):
-            for j in range(self.size):
-                r[i,j] = self.matrix[i][j] + other[i, j]
-        return r
+        return Matrix.fromBuffer(getBackend().add(self.data, other.data), self.size)
 
     @overload
     def __mul__(self, other: 'Matrix') -> 'Matrix': ...
@@ -232,31 +304,60 @@ class Matrix:
         2. Matrix * number => Matrix
         3. Matrix * Vector => Vector (Only multiplication on the right)
         '''
-        r = zeros(self.size)
+        n = self.size
         if isinstance(other, Matrix):
-            assert self.size == other.size, ShapeException(self.size, other.size)
-            for i in range(self.size):
-                for j in range(self.size):
-                    for k in range(self.size):
-                        r[i,j] += self[i,k] * other[k,j]
+            assert n == other.size, ShapeException(n, other.size)
+            return Matrix.fromBuffer(getBackend().matmul(self.data, other.data, n), n)
         elif isinstance(other, Vector):
-            assert self.size == len(other)
-            r = Vector(self.size)
-            for i in range(self.size):
-                r[i] = sum([self.matrix[i][j] * k for j, k in enumerate(other)])
-            return r
+            assert n == len(other), ShapeException(n, len(other))
+            return Vector.fromBuffer(getBackend().matvec(self.data, other.body, n))
         else:
-            for i in range(self.size):
-                for j in range(self.size):
-                    r[i, j] = self.matrix[i][j] * other
-        return r
+            return Matrix.fromBuffer(getBackend().scale(self.data, other), n)
+
+    def matvec(self, x: Vector, out: Optional[Vector] = None) -> Vector:
+        '''
+        Product `A*x` written into `out` (a new vector if it is None),
+        `out` must not share elements with x
+        '''
+        assert self.size == len(x), ShapeException(self.size, len(x))
+        kernel = getBackend().matvec
+        if out is None:
+            return Vector.fromBuffer(kernel(self.data, _buffer(x), self.size))
+        assert self.size == len(out), ShapeException(self.size, len(out))
+        return out._write(lambda out=None: kernel(self.data, _buffer(x), self.size, out))
+
+    def _write(self, kernel, *args) -> 'Matrix':
+        kernel(*args, out=self.data)
+        return self
+
+    def __iadd__(self, other: 'Matrix'):
+        assert self.size == other.size, ShapeException(self.size, other.size)
+        return self._write(getBackend().add, self.data, other.data)
+
+    def __isub__(self, other: 'Matrix'):
+        assert self.size == other.size, ShapeException(self.size, other.size)
+        return self._write(getBackend().sub, self.data, other.data)
+
+    def __imul__(self, other: float):
+        '''
+        Multiplication by a number in place (`A *= B` for matrices makes a new product)
+        '''
+        if isinstance(other, Matrix):
+            return self * other
+        return self._write(getBackend().scale, self.data, other)
+
+    def __reduce__(self):
+        '''
+        Matrices (views and memory-mapped ones as well) are pickled with a copy of their elements
+        '''
+        return Matrix.fromBuffer, (array('d', self.data), self.size)
 
     def __len__(self):
         '''
         The size of a square matrix can be characterized by one number - the number of rows or columns
         '''
         return self.size
-    
+
     def __str__(self) -> str:
         '''
         Returns matrix in pretty to print form
@@ -267,6 +368,74 @@ class Matrix:
         return s
 
 
+class MatrixView(Matrix):
+    '''
+    Square submatrix looking at elements of another matrix buffer:
+    element `(i, j)` is `base[offset + i*rowStride + j*colStride]`.
+    Elements, rows and columns are read from and written to the buffer,
+    `copy` makes an independent `Matrix`. `data` of a view is a copy of its
+    elements, so all `Matrix` operations work, but changing `data` does not change the view
+    '''
+    __slots__ = ('base', 'offset', 'rowStride', 'colStride')
+
+    def __init__(self, base: array, offset: int, n: int, rowStride: int, colStride: int = 1):
+        '''
+        params
+        ------
+        base: array('d')
+            buffer with elements
+        offset: int
+            index of the element `(0, 0)` in the buffer
+        n: int
+            size of matrix
+        rowStride: int
+            distance between rows in the buffer
+        colStride: int
+            distance between columns in the buffer
+        '''
+        self.base = base
+        self.offset = offset
+        self.size = n
+        self.rowStride = rowStride
+        self.colStride = colStride
+
+    def _layout(self) -> Tuple[array, int, int, int]:
+        return self.base, self.offset, self.rowStride, self.colStride
+
+    @property
+    def data(self) -> array:
+        data = array('d')
+        for i in range(self.size):
+            data.extend(self.row(i))
+        return data
+
+    def row(self, i: int) -> array:
+        return self[i].body
+
+    def rowDot(self, i: int, x: array) -> float:
+        return sum(map(mul, self.row(i), x))
+
+    def diagonal(self) -> array:
+        return VectorView(self.base, self.offset, self.size, self.rowStride + self.colStride).body
+
+    def copy(self) -> Matrix:
+        '''
+        Independent matrix with the same elements
+        '''
+        return Matrix.fromBuffer(self.data, self.size)
+
+    def swap(self, i: int, j: int):
+        if i != j:
+            self[i][:], self[j][:] = self.row(j), self.row(i)
+
+    def _write(self, kernel, *args) -> 'MatrixView':
+        data = kernel(*args)
+        n = self.size
+        for i in range(n):
+            self[i][:] = data[i*n:(i+1)*n]
+        return self
+
+
 def zeros(n: int):
     '''
     Return zero-matrix of given size
@@ -276,7 +445,7 @@ def zeros(n: int):
     n: int
         size of matrix
     '''
-    return Matrix([[0] * n for _ in range(n)])
+    return Matrix.fromBuffer(array('d', [0.]) * (n * n), n)
 
 def eye(n: int):
     '''
@@ -288,34 +457,257 @@ def eye(n: int):
         size of matrix
     '''
     m = zeros(n)
-    for i in range(n):
-        m[i,i] = 1
+    m.data[::n+1] = array('d', [1.]) * n
     return m
 
-def getP(m: Matrix):
+class Permutation:
+    '''
+    Permutation of matrix rows stored as an index array instead of
+    a permutation matrix: row i of `P*A` is row `perm[i]` of A.
+    Applying it to a matrix costs O(n^2) and to a vector O(n)
     '''
-    Get a permutation matrix for a given matrix. 
-    Multiplication on the right by this matrix guarantees that 
-    there will be no zeros on the diagonal of the 
+    __slots__ = ('perm',)
+
+    def __init__(self, perm: Union[int, Iterable[int]]):
+        '''
+        params
+        ------
+        perm: int | Iterable[int]
+            size of the identity permutation or the index array
+        '''
+        self.perm = array('q', range(perm) if isinstance(perm, int) else perm)
+
+    def swap(self, i: int, j: int):
+        '''
+        Swaps i'th and j'th rows of the permutation
+        '''
+        p = self.perm
+        p[i], p[j] = p[j], p[i]
+
+    @property
+    def inverse(self) -> 'Permutation':
+        '''
+        Inverse permutation (the transposed permutation matrix)
+        '''
+        inv = array('q', self.perm)
+        for i, j in enumerate(self.perm):
+            inv[j] = i
+        return Permutation(inv)
+
+    @property
+    def T(self) -> 'Permutation':
+        return self.inverse
+
+    def toMatrix(self) -> Matrix:
+        '''
+        Dense permutation matrix
+        '''
+        n = len(self.perm)
+        p = zeros(n)
+        for i, j in enumerate(self.perm):
+            p.data[i*n + j] = 1.
+        return p
+
+    @overload
+    def __mul__(self, other: 'Permutation') -> 'Permutation': ...
+
+    @overload
+    def __mul__(self, other: Matrix) -> Matrix: ...
+
+    @overload
+    def __mul__(self, other: Union[Vector, List[float]]) -> Vector: ...
+
+    def __mul__(self, other):
+        '''
+        1. Permutation * Permutation => Permutation (composition)
+        2. Permutation * Matrix => Matrix with reordered rows, O(n^2)
+        3. Permutation * Vector => Vector with reordered elements, O(n)
+        '''
+        perm = self.perm
+        n = len(perm)
+        if isinstance(other, Permutation):
+            assert n == len(other), ShapeException(n, len(other))
+            return Permutation(map(other.perm.__getitem__, perm))
+        if isinstance(other, Matrix):
+            assert n == other.size, ShapeException(n, other.size)
+            d = other.data
+            data = array('d')
+            for i in perm:
+                data.extend(d[i*n:(i+1)*n])
+            return Matrix.fromBuffer(data, n)
+        if isinstance(other, (Vector, list, tuple, array)):
+            assert n == len(other), ShapeException(n, len(other))
+            b = other.body if isinstance(other, Vector) else other
+            return Vector.fromBuffer(array('d', map(b.__getitem__, perm)))
+        return NotImplemented
+
+    def __getitem__(self, i: int) -> int:
+        return self.perm[i]
+
+    def __iter__(self):
+        return iter(self.perm)
+
+    def __len__(self):
+        return len(self.perm)
+
+    def __str__(self) -> str:
+        return f'Permutation({self.perm.tolist()})'
+
+
+def getP(m: Matrix) -> Permutation:
+    '''
+    Get a permutation for a given matrix.
+    Multiplication on the right by this permutation guarantees that
+    there will be no zeros on the diagonal of the
     multiplication result (if the original matrix does not contain zero columns)
 
     params
     ------
-    m: Matrix
-        the matrix for which the permutation matrix will be constructed
+    m: Matrix | SparseMatrix
+        the matrix for which the permutation will be constructed
     '''
-    n = len(m)
-    p = eye(n)
-    m_copy = Matrix(m.matrix)
-    for i in range(n):
+    p = Permutation(len(m))
+    for i in range(len(m)):
         if m[i, i] == 0:
-            for  j in range(i,n):
-                if m[i, j] != 0:
-                    p.swap(i,j)
-                    m_copy.swap(i,j)
+            for j, v in zip(*m.rowItems(i)):
+                if j >= i and v != 0:
+                    p.swap(i, j)
                     break
     return p
 
+def isDiagonallyDominant(m: Matrix) -> bool:
+    '''
+    Checks that the matrix is strictly diagonally dominant by rows:
+    `|a_ii| > Sum_(j != i)|a_ij|` for every row
+
+    params
+    ------
+    m: Matrix | SparseMatrix
+        matrix to check
+    '''
+    diag = m.diagonal()
+    for i in range(len(m)):
+        d = abs(diag[i])
+        if d <= sum(map(abs, m.rowItems(i)[1])) - d:
+            return False
+    return True
+
+def isSymmetric(m: Matrix, tol: float = 0.) -> bool:
+    '''
+    Checks that `|a_ij - a_ji| <= tol` for all elements
+
+    params
+    ------
+    m: Matrix | SparseMatrix
+        matrix to check
+    tol: float
+        allowed difference of symmetric elements
+    '''
+    n = len(m)
+    if not isinstance(m, Matrix):
+        t = m.T
+        for i in range(n):
+            row = dict(zip(*m.rowItems(i)))
+            col = dict(zip(*t.rowItems(i)))
+            if any(abs(row.get(j, 0.) - col.get(j, 0.)) > tol for j in row.keys() | col.keys()):
+                return False
+        return True
+    d = m.data
+    for i in range(n):
+        row = d[i*n+i+1:(i+1)*n]
+        col = d[(i+1)*n+i::n]
+        if any(abs(a - b) > tol for a, b in zip(row, col)):
+            return False
+    return True
+
+def isPositiveDefinite(m: Matrix) -> bool:
+    '''
+    Checks that a symmetric matrix is positive definite by trying
+    its Cholesky decomposition (n^3/6 multiplications).
+    A sparse or band matrix with a positive diagonal that is diagonally
+    dominant with a strictly dominant row in every connected block of
+    its graph is positive definite (O(nnz) check), otherwise the Cholesky
+    decomposition is done on the pattern of the matrix including fill-in
+
+    params
+    ------
+    m: Matrix | SparseMatrix | BandedMatrix
+        symmetric matrix to check
+    '''
+    if not isinstance(m, Matrix):
+        if not all(d > 0 for d in m.diagonal()):
+            return False
+        return _irreduciblyDominant(m) or _sparseCholesky(m)
+    n = len(m)
+    L = [array('d', [0.]) * (i+1) for i in range(n)]
+    for i in range(n):
+        row = m.row(i)
+        Li = L[i]
+        for j in range(i):
+            Li[j] = (row[j] - sum(map(mul, Li[:j], L[j][:j]))) / L[j][j]
+        s = row[i] - sum(map(mul, Li[:i], Li[:i]))
+        if s <= 0:
+            return False
+        Li[i] = s ** 0.5
+    return True
+
+def _irreduciblyDominant(m) -> bool:
+    '''
+    Checks that `|a_ii| >= Sum_(j != i)|a_ij|` for every row and that every connected
+    block of the graph of the matrix has a row where the inequality is strict
+    '''
+    n = len(m)
+    diag = m.diagonal()
+    strict = []
+    for i in range(n):
+        d = abs(diag[i])
+        off = sum(map(abs, m.rowItems(i)[1])) - d
+        if d < off:
+            return False
+        strict.append(d > off)
+    seen = [False] * n
+    for i in range(n):
+        if seen[i]:
+            continue
+        seen[i] = True
+        stack = [i]
+        found = False
+        while stack:
+            k = stack.pop()
+            found = found or strict[k]
+            for j in m.rowItems(k)[0]:
+                if not seen[j]:
+                    seen[j] = True
+                    stack.append(j)
+        if not found:
+            return False
+    return True
+
+def _sparseCholesky(m) -> bool:
+    '''
+    Tries the Cholesky decomposition of a symmetric sparse or band matrix
+    storing only nonzero elements of the lower triangle by columns
+    '''
+    n = len(m)
+    cols = [{} for _ in range(n)]  # cols[j][i] - element (i, j) of the Schur complement, i >= j
+    for i in range(n):
+        for j, v in zip(*m.rowItems(i)):
+            if j <= i and v:
+                cols[j][i] = v
+    for k in range(n):
+        col = cols[k]
+        d = col.pop(k, 0.)
+        if not d > 0:
+            return False
+        items = sorted(col.items())
+        for a, (i, lik) in enumerate(items):
+            f = lik / d
+            target = cols[i]
+            for j, ljk in items[a:]:
+                target[j] = target.get(j, 0.) - f * ljk
+        cols[k] = None
+    return True
+
 def dot(v1: Vector, v2: Vector) -> Matrix:
     '''
     The product of a "row vector" by a "column vector" according to the rules of matrix multiplication.
@@ -327,12 +719,62 @@ def dot(v1: Vector, v2: Vector) -> Matrix:
         column vector
     '''
     assert len(v1) == len(v2)
-    n = len(v1)
-    l = [[0] * n for _ in range(n)]
-    for i in range(n):
-        for j in range(n):
-            l[i][j] = v1[i] * v2[j]
-    return Matrix(l)
+    return Matrix.fromBuffer(getBackend().outer(v1.body, v2.body), len(v1))
+
+def gemv(alpha: float, A: Matrix, x: Vector, beta: float = 0., y: Optional[Vector] = None,
+         out: Optional[Vector] = None) -> Vector:
+    '''
+    Fused `alpha*A*x + beta*y` without temporary vectors for a dense matrix
+
+    params
+    ------
+    alpha: float
+        factor of the product
+    A: Matrix | SparseMatrix | BandedMatrix
+        matrix
+    x: Vector
+        vector multiplied by the matrix
+    beta: float
+        factor of y
+    y: Vector | None
+        added vector (nothing is added if it is None)
+    out: Vector | None
+        vector to write the result to (a new vector if it is None), may be y
+    '''
+    n = len(A)
+    assert n == len(x), ShapeException(n, len(x))
+    assert y is None or n == len(y), ShapeException(n, len(y))
+    yb = None if y is None or not beta else _buffer(y)
+    if not isinstance(A, Matrix):
+        r = A * x
+        if yb is None:
+            return r.mul(alpha, out=out)
+        r *= alpha
+        return r.add(Vector.fromBuffer(yb) * beta, out=out)
+    kernel = getBackend().gemv
+    if out is None:
+        return Vector.fromBuffer(kernel(A.data, _buffer(x), n, alpha, beta, yb))
+    assert n == len(out), ShapeException(n, len(out))
+    return out._write(lambda out=None: kernel(A.data, _buffer(x), n, alpha, beta, yb, out))
+
+def residualNorm(A: Matrix, x: Vector, b: Vector) -> float:
+    '''
+    Norm of the residual `|A*x - b|` without temporary vectors for a dense matrix
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
+        matrix of system
+    x: Vector
+        approximation of solution
+    b: Vector
+        free vector of system
+    '''
+    n = len(A)
+    assert n == len(x) == len(b), ShapeException(n, len(x))
+    if isinstance(A, Matrix):
+        return getBackend().residualNorm(A.data, _buffer(x), _buffer(b), n)
+    return (A * x - b).abs()
 
 
 if __name__ == '__main__':
@@ -342,4 +784,4 @@ if __name__ == '__main__':
         [7,8,9]
     ])
     print(A.extend(3))
-    print(A.T)
\ No newline at end of file
+    print(A.T)
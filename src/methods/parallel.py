@@ -0,0 +1,233 @@
+'''
+Parallel
+========
+Iterative methods whose sweeps are split by rows across worker
+processes. The matrix, the free vector and the approximation live in
+`multiprocessing.shared_memory` buffers: workers attach to them once
+and nothing is copied between iterations, processes only meet on
+barriers. Two methods are available:
+
+Jacobi - every row is updated from the previous approximation
+red-black Seidel - rows are colored by parity of their index, all
+rows of one color are updated at once from the current approximation
+'''
+
+from array import array
+from multiprocessing import Barrier, Process
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count
+from threading import BrokenBarrierError
+from typing import List, Optional, Union
+
+from .backend import getBackend
+from .convergence import Monitor, StoppingCriteria
+from .matrix import Matrix, isDiagonallyDominant
+from .Seildel import converges
+from .stats import phase
+from .utility import permutation
+from .vector import Vector
+
+# commands of the control buffer
+_STOP, _JACOBI, _REDBLACK = 0, 1, 2
+
+
+def _worker(names: List[str], n: int, first: int, last: int, index: int, omega: float, start, sweepBarrier):
+    '''
+    Loop of a worker process updating rows `first..last-1`. It waits for a
+    command on the `start` barrier, synchronizes with other workers on
+    `sweepBarrier` and stores squared norms of its update and residual in `stats`
+    '''
+    shms = [SharedMemory(name) for name in names]
+    views = [shm.buf.cast('d') for shm in shms]
+    A, b, x, y, control, stats = views
+    rows = [A[i*n:(i+1)*n] for i in range(first, last)]
+    inner = getBackend().inner
+    diag = [rows[i - first][i] for i in range(first, last)]
+
+    def update(color: Optional[int]) -> float:
+        own = range(first, last) if color is None else range(first + (first + color) % 2, last, 2)
+        for i in own:
+            y[i] = x[i] + omega * (b[i] - inner(rows[i - first], x)) / diag[i - first]
+        sweepBarrier.wait()
+        dd = 0.
+        for i in own:
+            delta = y[i] - x[i]
+            dd += delta * delta
+            x[i] = y[i]
+        sweepBarrier.wait()
+        return dd
+
+    try:
+        while True:
+            start.wait()
+            command = int(control[0])
+            if command == _STOP:
+                break
+            if command == _JACOBI:
+                dd = update(None)
+            else:
+                dd = update(0) + update(1)
+            r = 0.
+            if control[1]:
+                for i in range(first, last):
+                    ri = inner(rows[i - first], x) - b[i]
+                    r += ri * ri
+            stats[2*index], stats[2*index + 1] = dd, r
+            start.wait()
+    except BaseException:
+        start.abort()
+        sweepBarrier.abort()
+        raise
+    finally:
+        for view in rows + views:
+            view.release()
+        for shm in shms:
+            shm.close()
+
+
+def _parallelSolve(command: int, A: Matrix, b: Union[Vector, List[float]], eps: float, workers: Optional[int],
+                   criteria: Optional[StoppingCriteria], omega: float):
+    assert isinstance(A, Matrix), 'parallel methods work with dense matrices'
+    b = Vector.fromIterable(b)
+    assert len(A) == len(b)
+    if not converges(A):
+        with phase('normal equations'):
+            b = A.T * b
+            A = A.T * A
+    if not isDiagonallyDominant(A):
+        # for a symmetric positive definite matrix the simultaneous update of a set of rows converges
+        # only with omega < 2 / rho(D^-1 A) restricted to these rows, rho is bounded by the greatest
+        # row sum of |D^-1 A| over the columns of the set (all of them for Jacobi, one color for red-black)
+        step = 1 if command == _JACOBI else 2
+        omega /= max(sum(abs(v) for j, v in zip(*A.rowItems(i)) if (j - i) % step == 0) / A[i, i]
+                     for i in range(len(A)))
+    n = len(A)
+    workers = max(1, min(workers or cpu_count() or 1, n))
+    monitor = Monitor(A, b, eps, criteria)
+    buffers = [A.data, b.body, array('d', [b[i] / A[i, i] for i in range(n)]), array('d', [0.]) * n,
+               array('d', [0.]) * 4, array('d', [0.]) * (2 * workers)]
+    shms = []
+    procs = []
+    views = []
+    start = Barrier(workers + 1)
+    sweepBarrier = Barrier(workers)
+    try:
+        for buf in buffers:
+            shm = SharedMemory(create=True, size=len(buf) * buf.itemsize)
+            shm.buf[:len(buf) * buf.itemsize] = memoryview(buf).cast('B')
+            shms.append(shm)
+        views = [shm.buf.cast('d') for shm in shms[2:]]
+        xs, _, control, stats = views
+        names = [shm.name for shm in shms]
+        bounds = [n * w // workers for w in range(workers + 1)]
+        for w in range(workers):
+            p = Process(target=_worker, args=(names, n, bounds[w], bounds[w + 1], w, omega, start, sweepBarrier), daemon=True)
+            p.start()
+            procs.append(p)
+        c = monitor.criteria
+        k = 0
+        x = Vector.fromBuffer(array('d', xs[:n]))
+        dx = None
+        residual = None
+        while not monitor.done(k, x, dx, residual):
+            k += 1
+            control[0] = command
+            control[1] = k % c.checkEvery == 0 or k >= c.maxIter
+            start.wait()
+            start.wait()
+            x = Vector.fromBuffer(array('d', xs[:n]))
+            dx = sum(stats[0::2]) ** 0.5
+            residual = sum(stats[1::2]) ** 0.5 if control[1] else None
+        return x, k
+    except BrokenBarrierError:
+        raise RuntimeError('a worker process of the parallel method failed')
+    finally:
+        if procs:
+            try:
+                views[2][0] = _STOP
+                start.wait(timeout=10)
+            except BrokenBarrierError:
+                pass
+        for p in procs:
+            p.join()
+        for view in views:
+            view.release()
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+@permutation
+def JacobiSolve(A: Matrix, b: Union[Vector, List[float]], eps: float, workers: Optional[int] = None,
+                criteria: Optional[StoppingCriteria] = None):
+    '''
+    Jacobi method with rows split across worker processes.
+    Learn more -> https://en.wikipedia.org/wiki/Jacobi_method
+
+    The Jacobi method is only guaranteed to converge for diagonally dominant matrices.
+    Like `SeidelSolve`, if the matrix is neither diagonally dominant nor symmetric
+    positive definite the normal equations are solved, and a symmetric positive definite
+    matrix that is not diagonally dominant is solved by damped Jacobi iterations
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system
+    b: Vactor | List[float]
+        Free vector of the system
+    eps: float
+        Required methodological error of the solution
+    workers: int | None
+        number of worker processes (all cores if None)
+    criteria: StoppingCriteria | None
+        iteration limit and other stopping settings
+
+    raises `ConvergenceException` if the required error can not be reached
+
+    returns
+    -------
+    x: Vector
+        Vector of solution
+    k: int
+        Number of iterations
+    '''
+    return _parallelSolve(_JACOBI, A, b, eps, workers, criteria, 1.)
+
+@permutation
+def RedBlackSeidelSolve(A: Matrix, b: Union[Vector, List[float]], eps: float, workers: Optional[int] = None,
+                        omega: float = 1., criteria: Optional[StoppingCriteria] = None):
+    '''
+    Red-black (multicolor) Seidel method with rows split across worker processes.
+    Rows with even indexes are updated first, then rows with odd indexes
+    use the new values. For matrices where rows of one color do not depend on
+    each other (e.g. tridiagonal or five-point stencil ones) it is the Seidel
+    method in the red-black ordering, for dense matrices rows of one color are updated Jacobi-like.
+    Like `JacobiSolve`, a matrix that is not diagonally dominant is solved by the normal equations
+    unless it is symmetric positive definite, and omega is damped by the greatest row sum of
+    |D^-1 A| over the columns of the row's color (it is 1 if rows of one color are independent)
+
+    params
+    ------
+    A: Matrix
+        Matrix of the system
+    b: Vactor | List[float]
+        Free vector of the system
+    eps: float
+        Required methodological error of the solution
+    workers: int | None
+        number of worker processes (all cores if None)
+    omega: float
+        relaxation parameter from (0, 2), 1 - no relaxation
+    criteria: StoppingCriteria | None
+        iteration limit and other stopping settings
+
+    raises `ConvergenceException` if the required error can not be reached
+
+    returns
+    -------
+    x: Vector
+        Vector of solution
+    k: int
+        Number of iterations
+    '''
+    assert 0 < omega < 2, omega
+    return _parallelSolve(_REDBLACK, A, b, eps, workers, criteria, omega)
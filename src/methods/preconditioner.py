@@ -0,0 +1,271 @@
+'''
+Preconditioner
+==============
+Preconditioners of the iterative methods. A preconditioner is an
+approximation M of the system matrix whose systems `M*z = r` are
+cheap to solve. It is built once for a matrix and can be passed to
+any number of solutions with that matrix.
+'''
+
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from operator import mul
+from typing import Callable, Optional, Union
+
+from .banded import BandedMatrix
+from .cache import fingerprint
+from .matrix import Matrix
+from .sparse import SparseMatrix
+from .vector import Vector
+
+
+class Preconditioner(ABC):
+    '''
+    Base class of preconditioners. Subclasses prepare everything
+    needed in the constructor and implement `apply`
+    '''
+    @abstractmethod
+    def apply(self, r: Vector) -> Vector:
+        '''
+        Returns `M^-1 * r`
+
+        params
+        ------
+        r: Vector
+            vector to precondition (usually a residual)
+        '''
+
+    def __call__(self, r: Vector) -> Vector:
+        return self.apply(r)
+
+    def applyMatrix(self, A: Matrix) -> Matrix:
+        '''
+        Returns `M^-1 * A`. The result for the last matrix is kept
+        (found by the fingerprint of A), so it is formed once for repeated solves
+        '''
+        key = fingerprint(A)
+        applied = getattr(self, '_applied', None)
+        if applied is None or applied[0] != key:
+            applied = self._applied = key, self._applyMatrix(A)
+        return applied[1]
+
+    def _applyMatrix(self, A: Matrix) -> Matrix:
+        '''
+        Applies the preconditioner to every column of A
+        '''
+        n = len(A)
+        cols = array('d')
+        for j in range(n):
+            cols.extend(self.apply(A[:, j]).body)
+        return Matrix.fromBuffer(cols, n).T
+
+
+class JacobiPreconditioner(Preconditioner):
+    '''
+    Diagonal (Jacobi) preconditioner `M = D`
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
+        Matrix of the system without zeros on the diagonal
+    '''
+    def __init__(self, A: Matrix):
+        self.inv = array('d', [1 / d for d in A.diagonal()])
+
+    def apply(self, r: Vector) -> Vector:
+        return Vector.fromBuffer(array('d', map(mul, self.inv, r)))
+
+    def _applyMatrix(self, A: Matrix) -> Matrix:
+        n = len(A)
+        if isinstance(A, SparseMatrix):
+            inv = self.inv
+            values = array('d', A.values)
+            for i in range(n):
+                for k in range(A.indptr[i], A.indptr[i+1]):
+                    values[k] *= inv[i]
+            return SparseMatrix(n, array('q', A.indptr), array('q', A.indices), values)
+        if isinstance(A, BandedMatrix):
+            w = A.lower + A.upper + 1
+            data = array('d')
+            for i in range(n):
+                d = self.inv[i]
+                data.extend([a * d for a in A.data[i*w:(i+1)*w]])
+            return BandedMatrix(n, A.lower, A.upper, data)
+        data = array('d')
+        for i in range(n):
+            d = self.inv[i]
+            data.extend([a * d for a in A.row(i)])
+        return Matrix.fromBuffer(data, n)
+
+
+class SSORPreconditioner(Preconditioner):
+    '''
+    Symmetric successive over-relaxation preconditioner
+    `M = (D + omega*L) * D^-1 * (D + omega*U) / (omega*(2 - omega))`,
+    where L and U are strictly lower and upper triangular parts of A
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
+        Matrix of the system without zeros on the diagonal
+    omega: float
+        relaxation parameter from (0, 2)
+    '''
+    def __init__(self, A: Matrix, omega: float = 1.):
+        assert 0 < omega < 2, omega
+        self.A = A
+        self.omega = omega
+        self.d = A.diagonal()
+
+    def _lower(self, i: int, y: array) -> float:
+        A = self.A
+        if isinstance(A, Matrix):
+            return sum(map(mul, A.row(i)[:i], y[:i]))
+        cols, vals = A.rowItems(i)
+        return sum(v * y[j] for j, v in zip(cols, vals) if j < i)
+
+    def _upper(self, i: int, z: array) -> float:
+        A = self.A
+        if isinstance(A, Matrix):
+            return sum(map(mul, A.row(i)[i+1:], z[i+1:]))
+        cols, vals = A.rowItems(i)
+        return sum(v * z[j] for j, v in zip(cols, vals) if j > i)
+
+    def apply(self, r: Vector) -> Vector:
+        w, d = self.omega, self.d
+        n = len(self.A)
+        y = array('d', [0.]) * n
+        scale = w * (2 - w)
+        for i in range(n):
+            y[i] = (scale * r[i] - w * self._lower(i, y)) / d[i]
+        y = array('d', map(mul, y, d))
+        z = array('d', [0.]) * n
+        for i in range(n - 1, -1, -1):
+            z[i] = (y[i] - w * self._upper(i, z)) / d[i]
+        return Vector.fromBuffer(z)
+
+
+class ILU0Preconditioner(Preconditioner):
+    '''
+    Incomplete LU decomposition without fill-in: L and U are computed
+    only in positions where A has nonzero elements. For a matrix
+    without zeros it coincides with the LU decomposition.
+    The factors of a sparse or band matrix are stored in the CSR format
+    on its own pattern (all elements inside the band for a band matrix), so
+    the setup costs O(sum of products of row lengths) and the memory O(nnz)
+
+    params
+    ------
+    A: Matrix | SparseMatrix | BandedMatrix
+        Matrix of the system
+    '''
+    def __init__(self, A: Matrix):
+        if not isinstance(A, Matrix):
+            self._sparse(A)
+            return
+        n = len(A)
+        LU = A.copy()
+        d = LU.data
+        for i in range(1, n):
+            row = d[i*n:(i+1)*n]
+            mask = [a != 0 for a in A.row(i)]
+            for k in range(i):
+                if not mask[k]:
+                    continue
+                rowk = d[k*n:(k+1)*n]
+                lik = row[k] / rowk[k]
+                row[k] = lik
+                row[k+1:] = array('d', [a - lik * u if m else a for a, u, m in zip(row[k+1:], rowk[k+1:], mask[k+1:])])
+            d[i*n:(i+1)*n] = row
+        self.LU = LU
+
+    def _sparse(self, A: Union[SparseMatrix, BandedMatrix]):
+        n = len(A)
+        indptr, indices, values = array('q', [0]), array('q'), array('d')
+        for i in range(n):
+            cols, vals = A.rowItems(i)
+            indices.extend(cols)
+            values.extend(vals)
+            indptr.append(len(indices))
+        # position of the diagonal element of every row
+        diag = array('q', [0]) * n
+        for i in range(n):
+            s, e = indptr[i], indptr[i+1]
+            k = bisect_left(indices, i, s, e)
+            if k == e or indices[k] != i:
+                raise ValueError(f'ILU(0) needs the diagonal element of row {i} in the pattern')
+            diag[i] = k
+        for i in range(1, n):
+            s, e = indptr[i], indptr[i+1]
+            position = {indices[k]: k for k in range(s, e)}
+            for k in range(s, diag[i]):
+                j = indices[k]
+                lij = values[k] = values[k] / values[diag[j]]
+                for m in range(diag[j] + 1, indptr[j+1]):
+                    p = position.get(indices[m])
+                    if p is not None:
+                        values[p] -= lij * values[m]
+        self.LU = SparseMatrix(n, indptr, indices, values)
+        self.diag = diag
+
+    def apply(self, r: Vector) -> Vector:
+        LU = self.LU
+        n = len(LU)
+        y = array('d', r)
+        if isinstance(LU, SparseMatrix):
+            indptr, indices, values, diag = LU.indptr, LU.indices, LU.values, self.diag
+            for i in range(n):
+                y[i] -= sum(values[k] * y[indices[k]] for k in range(indptr[i], diag[i]))
+            for i in range(n - 1, -1, -1):
+                y[i] = (y[i] - sum(values[k] * y[indices[k]] for k in range(diag[i] + 1, indptr[i+1]))) / values[diag[i]]
+            return Vector.fromBuffer(y)
+        for i in range(n):
+            y[i] -= sum(map(mul, LU.row(i)[:i], y[:i]))
+        for i in range(n - 1, -1, -1):
+            row = LU.row(i)
+            y[i] = (y[i] - sum(map(mul, row[i+1:], y[i+1:]))) / row[i]
+        return Vector.fromBuffer(y)
+
+
+class CallablePreconditioner(Preconditioner):
+    '''
+    Preconditioner given by a user function returning `M^-1 * r`
+
+    params
+    ------
+    f: Callable[[Vector], Vector]
+        function applying the preconditioner
+    '''
+    def __init__(self, f: Callable[[Vector], Vector]):
+        self.f = f
+
+    def apply(self, r: Vector) -> Vector:
+        return Vector.fromIterable(self.f(r))
+
+
+_named = {
+    'jacobi': JacobiPreconditioner,
+    'ssor': SSORPreconditioner,
+    'ilu0': ILU0Preconditioner,
+}
+
+def makePreconditioner(p: Union[None, str, Preconditioner, Callable[[Vector], Vector]], A: Matrix) -> Optional[Preconditioner]:
+    '''
+    Turns the `preconditioner` argument of the solvers into a preconditioner
+
+    params
+    ------
+    p: None | str | Preconditioner | Callable[[Vector], Vector]
+        None - no preconditioning, 'jacobi', 'ssor' or 'ilu0' - preconditioner
+        built for A, a Preconditioner - used as is, a function - wrapped into `CallablePreconditioner`
+    A: Matrix
+        Matrix the named preconditioners are built for
+    '''
+    if p is None or isinstance(p, Preconditioner):
+        return p
+    if isinstance(p, str):
+        if p not in _named:
+            raise ValueError(f'unknown preconditioner {p!r}, choose from {list(_named)}')
+        return _named[p](A)
+    return CallablePreconditioner(p)
@@ -0,0 +1,412 @@
+'''
+Server
+======
+Local asyncio service solving systems sent as JSON lines over TCP on
+localhost or a Unix socket. Requests with the same matrix and method that
+arrive within `batchDelay` seconds are coalesced into one job: with a direct
+method ('lu', 'qr', 'cholesky') the matrix is decomposed once and all free
+vectors are solved by `solveMany`. Jobs run in worker processes, jobs of
+the same matrix always go to the same process, so the `FactorizationCache`
+of the process reuses the decomposition for later batches as well, and then
+the matrix is not sent to the process again. A worker process that dies is
+restarted and its batch is retried once. Requests are parsed and hashed in
+threads, so a large request does not stall the event loop.
+
+Request: {"id", "A", "b", "method", "eps", "key", "timeout"} with A in the format
+of `python -m methods`, "key" is an explicit key of the matrix (its fingerprint
+by default) and "timeout" is in seconds. Response: {"id", "status", "x", "method",
+"iterations", "batch", "time", "error"}, the status is 'ok', 'error', 'timeout',
+'overloaded' (too many requests are queued) or the status of `ConvergenceException`.
+Responses of one connection are written as soon as they are ready, not in the
+order of requests. Request {"op": "stats"} returns counters of the server.
+
+    python -m methods.server --port 8765 --workers 4
+    python -m methods.server --unix /tmp/solve.sock
+'''
+
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from .Cholesky import CholeskyFactorization
+from .LU import LUFactorization
+from .QR import QRFactorization
+from .backend import setBackend
+from .banded import BandedLUFactorization, BandedMatrix
+from .batch import _resolve, parseSystem, solveRecord
+from .cache import FactorizationCache, fingerprint
+from .matrix import Matrix, ShapeException
+from .vector import Vector
+
+_factories = {
+    'lu': LUFactorization,
+    'qr': QRFactorization,
+    'cholesky': CholeskyFactorization,
+}
+
+_cache: Optional[FactorizationCache] = None  # decompositions kept by a worker process
+
+
+def _initWorker(maxEntries: int, maxBytes: Optional[int], backend: Optional[str], inherited: Tuple[int, ...] = ()):
+    global _cache
+    for fd in inherited:  # sockets of the server copied by the fork, they would keep connections open
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    _cache = FactorizationCache(maxEntries, maxBytes)
+    if backend:
+        setBackend(backend)
+
+def _factory(method: str, A) -> Optional[type]:
+    '''
+    Decomposition class of a direct method for the matrix, None for other methods
+    '''
+    if method not in _factories:
+        return None
+    if isinstance(A, BandedMatrix) and method == 'lu':
+        return BandedLUFactorization
+    return _factories[method]
+
+def _solveGroup(method: str, factory: Optional[type], A, key: Hashable,
+                rhs: List[Tuple[Vector, Optional[float]]]) -> Optional[List[dict]]:
+    '''
+    Solves the systems with the same matrix in a worker process. A direct method
+    may be sent without the matrix (A is None) when its decomposition is expected
+    in the cache of the process
+
+    returns results of `batch.solveRecord` in the order of rhs,
+    None if A is None and the decomposition is not cached
+    '''
+    if factory is None:
+        return [solveRecord(0, (A, b), method, eps) for b, eps in rhs]
+    result = {'status': 'ok', 'x': None, 'method': method, 'iterations': None}
+    try:
+        if A is None:
+            f = _cache.lookup(factory, key)
+            if f is None:
+                return None
+        else:
+            if factory is not BandedLUFactorization and not isinstance(A, Matrix):
+                A = A.toDense()
+            f = _cache.get(A, factory, key)
+        xs = f.solveMany([b for b, _ in rhs])
+    except Exception as e:
+        return [dict(result, status='error', error=f'{type(e).__name__}: {e}')] * len(rhs)
+    return [dict(result, x=x) for x in xs]
+
+
+class _Group:
+    '''
+    Requests with the same matrix and method waiting for one job
+    '''
+    __slots__ = ('method', 'A', 'key', 'rhs', 'waiting', 'done', 'timer', 'job')
+
+    def __init__(self, method: str, A, key: Hashable, done: asyncio.Future):
+        self.method = method
+        self.A = A
+        self.key = key
+        self.rhs: List[Tuple[Vector, Optional[float]]] = []
+        self.waiting = 0  # requests that have not timed out
+        self.done = done  # list of results of `_solveGroup`
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.job: Optional[asyncio.Future] = None
+
+
+class SolveServer:
+    '''
+    Service coalescing requests with the same matrix, see the module description
+
+    params
+    ------
+    workers: int | None
+        number of worker processes (all cores if None)
+    method: str
+        default method of requests, one of `batch._methods`
+    eps: float | None
+        default required error, iterative methods use 1e-6 if it is None
+    timeout: float | None
+        default timeout of a request in seconds (None - unlimited)
+    maxQueue: int
+        greatest number of requests being solved, further requests are answered 'overloaded'
+    batchDelay: float
+        seconds a new batch waits for other requests with the same matrix
+    maxBatch: int
+        greatest number of free vectors in a batch, a full batch is sent at once
+    cacheEntries, cacheBytes: int, int | None
+        limits of the `FactorizationCache` of every worker process
+    backend: str | None
+        arithmetic backend of the workers
+    maxRequestBytes: int
+        greatest length of a request line
+    '''
+    def __init__(self, workers: Optional[int] = None, method: str = 'lu', eps: Optional[float] = None,
+                 timeout: Optional[float] = None, maxQueue: int = 1024, batchDelay: float = 0.002,
+                 maxBatch: int = 64, cacheEntries: int = 16, cacheBytes: Optional[int] = None,
+                 backend: Optional[str] = None, maxRequestBytes: int = 2**28):
+        _resolve(method)
+        assert maxQueue > 0 and maxBatch > 0
+        self.method = method
+        self.eps = eps
+        self.timeout = timeout
+        self.maxQueue = maxQueue
+        self.batchDelay = batchDelay
+        self.maxBatch = maxBatch
+        self.maxRequestBytes = maxRequestBytes
+        self.cacheEntries = cacheEntries
+        self._initargs = (cacheEntries, cacheBytes, backend)
+        self._sockets: Set[int] = set()  # descriptors a restarted worker closes after the fork
+        # one process per shard: jobs of a matrix meet its cached decomposition
+        self._shards = [self._startShard() for _ in range(workers or os.cpu_count() or 1)]
+        # (decomposition class, key) of the matrices sent to a shard, in LRU order like its cache
+        self._known: List['OrderedDict[Tuple[type, Hashable], None]'] = [OrderedDict() for _ in self._shards]
+        self._open: Dict[Tuple[str, Hashable], _Group] = {}
+        self.queued = 0
+        self.counters = {'requests': 0, 'batches': 0, 'coalesced': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0,
+                         'restarts': 0, 'resent': 0}
+
+    def _startShard(self) -> ProcessPoolExecutor:
+        shard = ProcessPoolExecutor(1, initializer=_initWorker, initargs=self._initargs + (tuple(self._sockets),))
+        shard.submit(int)  # start the process now, a fork in a later batch would inherit sockets of open connections
+        return shard
+
+    def _restart(self, index: int, broken: ProcessPoolExecutor):
+        '''
+        Replaces the executor of a shard whose process has died, the decompositions it cached are lost
+        '''
+        if self._shards[index] is not broken:
+            return  # another batch of the shard has already restarted it
+        broken.shutdown(wait=False)
+        self._shards[index] = self._startShard()
+        self._known[index].clear()
+        self.counters['restarts'] += 1
+
+    def _join(self, method: str, A, key: Hashable, b: Vector, eps: Optional[float]) -> Tuple[_Group, int]:
+        loop = asyncio.get_running_loop()
+        group = self._open.get((method, key))
+        if group is None:
+            group = self._open[method, key] = _Group(method, A, key, loop.create_future())
+            group.timer = loop.call_later(self.batchDelay, self._flush, group)
+        else:
+            self.counters['coalesced'] += 1
+        group.rhs.append((b, eps))
+        group.waiting += 1
+        if len(group.rhs) >= self.maxBatch:
+            self._flush(group)
+        return group, len(group.rhs) - 1
+
+    def _flush(self, group: _Group):
+        '''
+        Closes the batch and sends it to the worker of its matrix
+        '''
+        if self._open.get((group.method, group.key)) is group:
+            del self._open[group.method, group.key]
+        group.timer.cancel()
+        if group.job is not None or not group.waiting:
+            return
+        self.counters['batches'] += 1
+        group.job = asyncio.ensure_future(self._run(group))
+        group.job.add_done_callback(lambda job: self._finish(group, job))
+
+    async def _run(self, group: _Group) -> List[dict]:
+        '''
+        Solves the batch in the worker of its matrix. The matrix is not sent if the worker
+        should have its decomposition, it is sent again if the worker has evicted it.
+        If the process of the worker dies, it is restarted and the batch is retried once
+        '''
+        loop = asyncio.get_running_loop()
+        index = hash(group.key) % len(self._shards)
+        factory = _factory(group.method, group.A)
+        known = self._known[index]
+        A = None if (factory, group.key) in known else group.A
+        retried = False
+        while True:
+            shard = self._shards[index]
+            try:
+                results = await loop.run_in_executor(shard, _solveGroup, group.method, factory, A, group.key, group.rhs)
+            except BrokenProcessPool:
+                if retried:
+                    raise
+                retried = True
+                self._restart(index, shard)
+                A = group.A
+                continue
+            if results is not None:
+                break
+            self.counters['resent'] += 1
+            A = group.A
+        if factory is not None and results[0]['status'] == 'ok':
+            known[factory, group.key] = None
+            known.move_to_end((factory, group.key))
+            while len(known) > self.cacheEntries:
+                known.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _finish(group: _Group, job: asyncio.Future):
+        if group.done.done():
+            return
+        if job.cancelled():
+            group.done.cancel()
+        elif job.exception() is not None:
+            group.done.set_exception(job.exception())
+        else:
+            group.done.set_result(job.result())
+
+    def _leave(self, group: _Group):
+        '''
+        Forgets a timed out request, a job nobody waits for is cancelled if it has not started
+        '''
+        group.waiting -= 1
+        if group.waiting:
+            return
+        if group.job is None:
+            self._flush(group)
+        else:
+            group.job.cancel()
+
+    @staticmethod
+    def _parse(request: dict) -> Tuple[object, Vector, Hashable]:
+        '''
+        Reads the system and the key of its matrix, runs in a thread not to stall the event loop
+        '''
+        A, b = parseSystem(request)
+        assert len(A) == len(b), ShapeException(len(A), len(b))
+        key = ('key', json.dumps(request['key'])) if 'key' in request else ('fingerprint', fingerprint(A))
+        return A, b, key
+
+    async def handle(self, request: dict) -> dict:
+        '''
+        Solves one request (a parsed JSON object) and returns the response
+        '''
+        start = perf_counter()
+        response = {'id': request.get('id'), 'status': 'ok', 'x': None}
+        if self.queued >= self.maxQueue:
+            self.counters['rejected'] += 1
+            return dict(response, status='overloaded', error=f'more than {self.maxQueue} requests are queued')
+        self.queued += 1
+        self.counters['requests'] += 1
+        group = None
+        try:
+            method = request.get('method', self.method)
+            _resolve(method)
+            A, b, key = await asyncio.get_running_loop().run_in_executor(None, self._parse, request)
+            group, index = self._join(method, A, key, b, request.get('eps', self.eps))
+            results = await asyncio.wait_for(asyncio.shield(group.done), request.get('timeout', self.timeout))
+            result = results[index]
+            response.update(status=result['status'], x=None if result['x'] is None else list(result['x']),
+                            method=result['method'], iterations=result['iterations'], batch=len(results))
+            if 'error' in result:
+                response['error'] = result['error']
+        except asyncio.TimeoutError:
+            self._leave(group)
+            self.counters['timeouts'] += 1
+            response.update(status='timeout', error='request timed out')
+        except Exception as e:
+            response.update(status='error', error=f'{type(e).__name__}: {e}')
+        finally:
+            self.queued -= 1
+        if response['status'] not in ('ok', 'timeout'):
+            self.counters['errors'] += 1
+        response['time'] = perf_counter() - start
+        return response
+
+    def stats(self) -> dict:
+        return dict(self.counters, queued=self.queued, workers=len(self._shards))
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter, lock: asyncio.Lock):
+        try:
+            request = await asyncio.get_running_loop().run_in_executor(None, json.loads, line)
+            if not isinstance(request, dict):
+                raise ValueError('request is not an object')
+        except ValueError as e:
+            response = {'id': None, 'status': 'error', 'x': None, 'error': f'{type(e).__name__}: {e}'}
+        else:
+            response = self.stats() if request.get('op') == 'stats' else await self.handle(request)
+        async with lock:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lock = asyncio.Lock()
+        tasks = set()
+        fd = writer.get_extra_info('socket').fileno()
+        self._sockets.add(fd)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(self._respond(line, writer, lock))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except (ConnectionError, ValueError):  # the client has gone or sent a too long line
+            for task in tasks:
+                task.cancel()
+        finally:
+            self._sockets.discard(fd)
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, path: Optional[str] = None) -> asyncio.AbstractServer:
+        '''
+        Starts listening on the TCP port of the host or on the Unix socket if the path is given
+
+        returns started `asyncio.Server`, e.g. for `await server.serve_forever()`
+        '''
+        if path is not None:
+            server = await asyncio.start_unix_server(self._connection, path, limit=self.maxRequestBytes)
+        else:
+            server = await asyncio.start_server(self._connection, host, port, limit=self.maxRequestBytes)
+        self._sockets.update(sock.fileno() for sock in server.sockets)
+        return server
+
+    def close(self):
+        '''
+        Stops the worker processes
+        '''
+        for shard in self._shards:
+            shard.shutdown(cancel_futures=True)
+
+
+async def _main(args):
+    solver = SolveServer(args.workers, args.method, args.eps, args.timeout, args.max_queue, args.batch_delay,
+                         args.max_batch, args.cache_entries, args.cache_bytes, args.backend)
+    try:
+        server = await solver.serve(args.host, args.port, args.unix)
+        async with server:
+            await server.serve_forever()
+    finally:
+        solver.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m methods.server', description='Local service solving linear systems')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='path of a Unix socket to listen on instead of TCP')
+    parser.add_argument('--workers', type=int, help='number of processes, all cores by default')
+    parser.add_argument('--method', default='lu', help='default method of requests')
+    parser.add_argument('--eps', type=float, help='default required error')
+    parser.add_argument('--timeout', type=float, help='default timeout of a request in seconds')
+    parser.add_argument('--max-queue', type=int, default=1024, help='greatest number of requests being solved')
+    parser.add_argument('--batch-delay', type=float, default=0.002, help='seconds a batch waits for other requests')
+    parser.add_argument('--max-batch', type=int, default=64, help='greatest number of free vectors in a batch')
+    parser.add_argument('--cache-entries', type=int, default=16, help='decompositions cached by a worker')
+    parser.add_argument('--cache-bytes', type=int, help='memory of decompositions cached by a worker')
+    parser.add_argument('--backend', choices=['python', 'numpy'], help='arithmetic backend')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
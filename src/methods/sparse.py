@@ -0,0 +1,306 @@
+'''
+Sparse
+======
+A square sparse matrix in the compressed sparse row (CSR) format.
+Only nonzero elements are stored, so matrix-vector products take
+O(nnz) instead of O(n^2). The iterative methods (`SeidelSolve`,
+`IterationSolve`, Krylov methods) accept it in place of `Matrix`.
+'''
+
+from array import array
+from bisect import bisect_left
+from operator import mul
+from typing import Dict, Iterable, Iterator, Tuple, Union, overload
+
+from .matrix import Matrix, Permutation, ShapeException
+from .stats import count
+from .vector import Vector
+
+
+class SparseMatrix:
+    '''
+    Square matrix in CSR format: nonzero elements of row i are
+    `values[indptr[i]:indptr[i+1]]`, their columns are
+    `indices[indptr[i]:indptr[i+1]]` (sorted)
+    '''
+    __slots__ = ('size', 'indptr', 'indices', 'values')
+
+    def __init__(self, n: int, indptr: array, indices: array, values: array):
+        '''
+        params
+        ------
+        n: int
+            size of matrix
+        indptr: array('q')
+            row starts, `n+1` elements
+        indices: array('q')
+            column indexes of elements
+        values: array('d')
+            values of elements
+        '''
+        assert len(indptr) == n + 1, ShapeException(len(indptr), n + 1)
+        assert len(indices) == len(values), ShapeException(len(indices), len(values))
+        self.size = n
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+
+    @staticmethod
+    def fromCOO(n: int, rows: Iterable[int], cols: Iterable[int], vals: Iterable[float]) -> 'SparseMatrix':
+        '''
+        Builds matrix from coordinate format: element `vals[k]` is at `(rows[k], cols[k])`.
+        Repeated positions are summed
+
+        params
+        ------
+        n: int
+            size of matrix
+        rows: Iterable[int]
+            row indexes
+        cols: Iterable[int]
+            column indexes
+        vals: Iterable[float]
+            values
+        '''
+        acc: list[Dict[int, float]] = [{} for _ in range(n)]
+        for i, j, v in zip(rows, cols, vals):
+            assert 0 <= i < n and 0 <= j < n, (i, j)
+            row = acc[i]
+            row[j] = row.get(j, 0.) + v
+        return SparseMatrix._fromRows(n, acc)
+
+    @staticmethod
+    def fromDense(m: Matrix) -> 'SparseMatrix':
+        '''
+        Builds sparse matrix from nonzero elements of a dense one
+        '''
+        n = len(m)
+        return SparseMatrix._fromRows(n, [{j: v for j, v in enumerate(m.row(i)) if v != 0} for i in range(n)])
+
+    @staticmethod
+    def _fromRows(n: int, rows: Iterable[Dict[int, float]]) -> 'SparseMatrix':
+        indptr = array('q', [0])
+        indices = array('q')
+        values = array('d')
+        for row in rows:
+            cols = sorted(j for j, v in row.items() if v != 0)
+            indices.extend(cols)
+            values.extend([row[j] for j in cols])
+            indptr.append(len(indices))
+        return SparseMatrix(n, indptr, indices, values)
+
+    @property
+    def nnz(self) -> int:
+        '''
+        Number of stored elements
+        '''
+        return len(self.values)
+
+    def rowItems(self, i: int) -> Tuple[array, array]:
+        '''
+        Columns and values of nonzero elements of i'th row
+        '''
+        s, e = self.indptr[i], self.indptr[i+1]
+        return self.indices[s:e], self.values[s:e]
+
+    def rows(self) -> Iterator[Tuple[array, array]]:
+        '''
+        Iterates over `rowItems` of all rows
+        '''
+        for i in range(self.size):
+            yield self.rowItems(i)
+
+    def rowDot(self, i: int, x: array) -> float:
+        '''
+        Product of i'th row by the vector buffer x
+        '''
+        s, e = self.indptr[i], self.indptr[i+1]
+        return sum(map(mul, self.values[s:e], map(x.__getitem__, self.indices[s:e])))
+
+    def diagonal(self) -> array:
+        '''
+        Buffer with diagonal elements
+        '''
+        return array('d', [self[i, i] for i in range(self.size)])
+
+    def toDense(self) -> Matrix:
+        '''
+        Dense copy of the matrix
+        '''
+        n = self.size
+        data = array('d', [0.]) * (n * n)
+        for i in range(n):
+            for j, v in zip(*self.rowItems(i)):
+                data[i*n + j] = v
+        return Matrix.fromBuffer(data, n)
+
+    def copy(self) -> 'SparseMatrix':
+        return SparseMatrix(self.size, array('q', self.indptr), array('q', self.indices), array('d', self.values))
+
+    @property
+    def T(self) -> 'SparseMatrix':
+        '''
+        Transposed matrix, O(nnz)
+        '''
+        n = self.size
+        counts = [0] * (n + 1)
+        for j in self.indices:
+            counts[j + 1] += 1
+        for j in range(n):
+            counts[j + 1] += counts[j]
+        indptr = array('q', counts)
+        pos = counts[:-1]
+        indices = array('q', [0]) * self.nnz
+        values = array('d', [0.]) * self.nnz
+        for i in range(n):
+            for j, v in zip(*self.rowItems(i)):
+                p = pos[j]
+                indices[p] = i
+                values[p] = v
+                pos[j] = p + 1
+        return SparseMatrix(n, indptr, indices, values)
+
+    def rmatvec(self, x: Vector) -> Vector:
+        '''
+        Product `A.T * x` without transposing the matrix
+        '''
+        assert self.size == len(x), ShapeException(self.size, len(x))
+        count('matvecs')
+        count('flops', 2 * self.nnz)
+        y = array('d', [0.]) * self.size
+        for i, xi in enumerate(x):
+            if xi:
+                for j, v in zip(*self.rowItems(i)):
+                    y[j] += v * xi
+        return Vector.fromBuffer(y)
+
+    def abs(self, t: int = 0) -> float:
+        '''
+        Matrix norm, the same as `Matrix.abs`
+        '''
+        if t == 0:
+            return max(map(abs, self.values), default=0.)
+        elif t == 1:
+            return max((sum(map(abs, vals)) for _, vals in self.rows()), default=0.)
+        elif t == 2:
+            s = [0.] * self.size
+            for j, v in zip(self.indices, self.values):
+                s[j] += abs(v)
+            return max(s, default=0.)
+        elif t == 3:
+            return sum(map(abs, self.values)) ** 0.5
+
+    @overload
+    def __getitem__(self, pos: Tuple[int, int]) -> float: ...
+
+    @overload
+    def __getitem__(self, pos: Tuple[slice, int]) -> Vector: ...
+
+    @overload
+    def __getitem__(self, pos: int) -> Vector: ...
+
+    def __getitem__(self, pos):
+        '''
+        Element `(i, j)`, column `[:, j]` or dense row `[i]` of the matrix
+        '''
+        if isinstance(pos, tuple):
+            i, j = pos
+            if isinstance(i, slice):
+                return Vector.fromIterable([self[k, j] for k in range(self.size)])
+            assert 0 <= i < self.size and 0 <= j < self.size
+            s, e = self.indptr[i], self.indptr[i+1]
+            k = bisect_left(self.indices, j, s, e)
+            if k < e and self.indices[k] == j:
+                return self.values[k]
+            return 0.
+        v = Vector(self.size)
+        for j, a in zip(*self.rowItems(pos)):
+            v[j] = a
+        return v
+
+    def _combine(self, other: 'SparseMatrix', sign: float) -> 'SparseMatrix':
+        assert self.size == other.size, ShapeException(self.size, other.size)
+        rows = []
+        for (c1, v1), (c2, v2) in zip(self.rows(), other.rows()):
+            row = dict(zip(c1, v1))
+            for j, v in zip(c2, v2):
+                row[j] = row.get(j, 0.) + sign * v
+            rows.append(row)
+        return SparseMatrix._fromRows(self.size, rows)
+
+    def __add__(self, other: 'SparseMatrix') -> 'SparseMatrix':
+        return self._combine(other, 1.)
+
+    def __sub__(self, other: 'SparseMatrix') -> 'SparseMatrix':
+        return self._combine(other, -1.)
+
+    @overload
+    def __mul__(self, other: Vector) -> Vector: ...
+
+    @overload
+    def __mul__(self, other: 'SparseMatrix') -> 'SparseMatrix': ...
+
+    @overload
+    def __mul__(self, other: float) -> 'SparseMatrix': ...
+
+    def __mul__(self, other: Union[Vector, 'SparseMatrix', float]):
+        '''
+        1. SparseMatrix * Vector => Vector, O(nnz)
+        2. SparseMatrix * SparseMatrix => SparseMatrix
+        3. SparseMatrix * number => SparseMatrix
+        '''
+        n = self.size
+        if isinstance(other, Vector):
+            assert n == len(other), ShapeException(n, len(other))
+            x = other.body
+            count('matvecs')
+            count('flops', 2 * self.nnz)
+            return Vector.fromBuffer(array('d', [self.rowDot(i, x) for i in range(n)]))
+        elif isinstance(other, SparseMatrix):
+            assert n == other.size, ShapeException(n, other.size)
+            rows = []
+            for cols, vals in self.rows():
+                row: Dict[int, float] = {}
+                for k, a in zip(cols, vals):
+                    for j, b in zip(*other.rowItems(k)):
+                        row[j] = row.get(j, 0.) + a * b
+                rows.append(row)
+            return SparseMatrix._fromRows(n, rows)
+        return SparseMatrix(n, array('q', self.indptr), array('q', self.indices),
+                            array('d', [v * other for v in self.values]))
+
+    def __rmul__(self, other: Permutation) -> 'SparseMatrix':
+        '''
+        Permutation * SparseMatrix => SparseMatrix with reordered rows, O(nnz)
+        '''
+        if not isinstance(other, Permutation):
+            return NotImplemented
+        assert len(other) == self.size, ShapeException(len(other), self.size)
+        indptr = array('q', [0])
+        indices = array('q')
+        values = array('d')
+        for i in other:
+            cols, vals = self.rowItems(i)
+            indices.extend(cols)
+            values.extend(vals)
+            indptr.append(len(indices))
+        return SparseMatrix(self.size, indptr, indices, values)
+
+    def __reduce__(self):
+        '''
+        Pickled with copies of the buffers (memory-mapped ones can not be pickled)
+        '''
+        return SparseMatrix, (self.size, array('q', self.indptr), array('q', self.indices), array('d', self.values))
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self) -> str:
+        return f'SparseMatrix(size={self.size}, nnz={self.nnz})'
+
+
+def sparseEye(n: int) -> SparseMatrix:
+    '''
+    Sparse unit matrix of given size
+    '''
+    return SparseMatrix(n, array('q', range(n + 1)), array('q', range(n)), array('d', [1.]) * n)
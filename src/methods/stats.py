@@ -0,0 +1,147 @@
+'''
+Stats
+=====
+Opt-in instrumentation of the solvers. Inside `with instrument() as stats:`
+every solve in the current thread (or asyncio task) records into `stats`:
+
+phases - seconds spent in 'permutation' (`utility.permutation`), 'factorization',
+'triangular solve', 'normal equations' (forming `A.T*A`), 'iterations'
+(the loop of an iterative method) and 'total'. Phases may be nested
+(e.g. triangular solves inside a QR solve), so they do not sum up to 'total'
+counters - 'matvecs' (matrix-vector products), 'flops' (floating point
+operations of the backend kernels and of the substitution and sweep loops),
+'allocations' and 'allocatedBytes' (result buffers created by the backend kernels)
+iterations, residual - of the last finished iterative method
+
+Without an active `instrument` all hooks are a single context variable lookup.
+'''
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, Iterator, Optional
+
+
+class SolveStats:
+    '''
+    Measurements collected by `instrument`
+
+    phases: Dict[str, float]
+        seconds spent in every phase
+    counters: Dict[str, int]
+        counted operations
+    iterations: int | None
+        number of iterations of the last finished iterative method
+    residual: float | None
+        last residual norm computed by the iterative method
+    '''
+    __slots__ = ('phases', 'counters', 'iterations', 'residual', 'backend', '_lock')
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.iterations: Optional[int] = None
+        self.residual: Optional[float] = None
+        self.backend = None  # counting wrapper of the backend, see `backend.getBackend`
+        self._lock = Lock()
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def addTime(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.) + seconds
+
+    def asDict(self) -> dict:
+        '''
+        Plain dictionary with all measurements (e.g. to send to a metrics system)
+        '''
+        return {
+            'phases': dict(self.phases),
+            'counters': dict(self.counters),
+            'iterations': self.iterations,
+            'residual': self.residual,
+        }
+
+    def __str__(self):
+        phases = ', '.join(f'{k}={v:.6f}s' for k, v in self.phases.items())
+        counters = ', '.join(f'{k}={v}' for k, v in self.counters.items())
+        return f'SolveStats(phases: {phases}; counters: {counters}; iterations={self.iterations}, residual={self.residual})'
+
+
+_current: ContextVar[Optional[SolveStats]] = ContextVar('stats', default=None)
+
+
+def currentStats() -> Optional[SolveStats]:
+    '''
+    Stats of the active `instrument`, None if the instrumentation is off
+    '''
+    return _current.get()
+
+@contextmanager
+def instrument(sink: Optional[Callable[[SolveStats], None]] = None) -> Iterator[SolveStats]:
+    '''
+    Turns the instrumentation on inside the `with` block
+
+    params
+    ------
+    sink: Callable[[SolveStats], None] | None
+        function receiving the stats when the block is left (also after an exception)
+
+    yields `SolveStats` filled while the block runs
+    '''
+    stats = SolveStats()
+    token = _current.set(stats)
+    start = perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.addTime('total', perf_counter() - start)
+        _current.reset(token)
+        if sink is not None:
+            sink(stats)
+
+def count(name: str, n: int = 1):
+    '''
+    Adds n to the counter if the instrumentation is on
+    '''
+    stats = _current.get()
+    if stats is not None:
+        stats.count(name, n)
+
+class phase:
+    '''
+    Context manager adding the time of its block to the phase if the instrumentation is on
+    '''
+    __slots__ = ('name', 'stats', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.stats = _current.get()
+        if self.stats is not None:
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.stats is not None:
+            self.stats.addTime(self.name, perf_counter() - self.start)
+        return False
+
+def timed(name: str):
+    '''
+    Decorator adding the time of every call of the function to the phase
+    '''
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return f(*args, **kwargs)
+            with phase(name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,305 @@
+'''
+Storage
+=======
+Binary files of matrices, vectors, systems and decompositions. Buffers
+are written as raw little-endian row-major float64 (int64 for indexes)
+after a small header, so a file is loaded by mapping it into memory:
+`Matrix.data`, `Vector.body` and the other buffers of a loaded object are
+`memoryview`s of the mapped file, nothing is parsed or copied.
+
+Format: 8 bytes of magic `LINSYS\\x01\\x00`, 4 bytes of the header length
+(little-endian), JSON header padded to 64 bytes, then the buffers each
+aligned to 64 bytes. The header describes the object (kind, sizes and
+nested objects) and the offsets of its buffers after the header, `dataSize`
+is the length of the buffers, so records can be concatenated into a stream (see `read`).
+
+NumPy `.npy` files of C-ordered float64 vectors and square matrices
+(int64 vectors for permutations) are read and written as well.
+'''
+
+import json
+import mmap
+import sys
+from array import array
+from ast import literal_eval
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+from .Cholesky import CholeskyFactorization, LowerTriangular
+from .LU import LUFactorization
+from .QR import QRFactorization
+from .banded import BandedLUFactorization, BandedMatrix
+from .matrix import Matrix, Permutation
+from .sparse import SparseMatrix
+from .vector import Vector
+
+MAGIC = b'LINSYS\x01\x00'
+NPY_MAGIC = b'\x93NUMPY'
+ALIGN = 64
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+def _littleEndian(buf, typecode: str) -> memoryview:
+    '''
+    Bytes of the buffer in little-endian order (copied only on big-endian machines)
+    '''
+    if sys.byteorder == 'little':
+        return memoryview(buf).cast('B')
+    a = array(typecode, buf)
+    a.byteswap()
+    return memoryview(a).cast('B')
+
+def _view(buf: memoryview, typecode: str, offset: int, length: int):
+    '''
+    Buffer of `length` elements at `offset` bytes of buf, without copying on little-endian machines
+    '''
+    view = buf[offset:offset + length * 8].cast(typecode)
+    if sys.byteorder == 'little':
+        return view
+    a = array(typecode, view)
+    a.byteswap()
+    return a
+
+def _encode(obj, prefix: str, arrays: Dict[str, Tuple[str, object]]) -> dict:
+    '''
+    Description of the object for the header, its buffers are added to arrays
+    '''
+    def put(name: str, typecode: str, buf) -> str:
+        arrays[prefix + name] = (typecode, buf)
+        return prefix + name
+
+    if isinstance(obj, tuple) and len(obj) == 2:
+        return {'kind': 'system', 'A': _encode(obj[0], prefix + 'A.', arrays), 'b': _encode(obj[1], prefix + 'b.', arrays)}
+    if isinstance(obj, Matrix):
+        return {'kind': 'matrix', 'n': len(obj), 'data': put('data', 'd', obj.data)}
+    if isinstance(obj, Vector):
+        return {'kind': 'vector', 'n': len(obj), 'data': put('data', 'd', obj.body)}
+    if isinstance(obj, Permutation):
+        return {'kind': 'permutation', 'n': len(obj), 'data': put('perm', 'q', obj.perm)}
+    if isinstance(obj, SparseMatrix):
+        return {'kind': 'sparse', 'n': len(obj), 'indptr': put('indptr', 'q', obj.indptr),
+                'indices': put('indices', 'q', obj.indices), 'values': put('values', 'd', obj.values)}
+    if isinstance(obj, BandedMatrix):
+        return {'kind': 'banded', 'n': len(obj), 'lower': obj.lower, 'upper': obj.upper, 'data': put('data', 'd', obj.data)}
+    if isinstance(obj, LowerTriangular):
+        return {'kind': 'lower triangular', 'n': len(obj), 'data': put('data', 'd', obj.data)}
+    if isinstance(obj, LUFactorization):
+        return {'kind': 'lu', 'P': _encode(obj.P, prefix + 'P.', arrays), 'LU': _encode(obj.LU, prefix + 'LU.', arrays)}
+    if isinstance(obj, CholeskyFactorization):
+        return {'kind': 'cholesky', 'L': _encode(obj.L, prefix + 'L.', arrays)}
+    if isinstance(obj, BandedLUFactorization):
+        return {'kind': 'banded lu', 'LU': _encode(obj.LU, prefix + 'LU.', arrays), 'pivots': put('pivots', 'q', obj.pivots)}
+    if isinstance(obj, QRFactorization):
+        W = array('d')
+        for w in obj.W:
+            if w is not None:
+                W.extend(w)
+        return {'kind': 'qr', 'R': _encode(obj.R, prefix + 'R.', arrays),
+                'reflections': [w is not None for w in obj.W], 'W': put('W', 'd', W)}
+    raise TypeError(f'can not store {type(obj).__name__}')
+
+def _decode(d: dict, buffers: dict):
+    kind = d['kind']
+    if kind == 'system':
+        return _decode(d['A'], buffers), _decode(d['b'], buffers)
+    if kind == 'matrix':
+        return Matrix.fromBuffer(buffers[d['data']], d['n'])
+    if kind == 'vector':
+        return Vector.fromBuffer(buffers[d['data']])
+    if kind == 'permutation':
+        P = Permutation.__new__(Permutation)
+        P.perm = buffers[d['data']]
+        return P
+    if kind == 'sparse':
+        return SparseMatrix(d['n'], buffers[d['indptr']], buffers[d['indices']], buffers[d['values']])
+    if kind == 'banded':
+        return BandedMatrix(d['n'], d['lower'], d['upper'], buffers[d['data']])
+    if kind == 'lower triangular':
+        return LowerTriangular(buffers[d['data']], d['n'])
+    if kind == 'lu':
+        f = LUFactorization.__new__(LUFactorization)
+        f.P, f.LU = _decode(d['P'], buffers), _decode(d['LU'], buffers)
+        return f
+    if kind == 'cholesky':
+        f = CholeskyFactorization.__new__(CholeskyFactorization)
+        f.L = _decode(d['L'], buffers)
+        return f
+    if kind == 'banded lu':
+        f = BandedLUFactorization.__new__(BandedLUFactorization)
+        f.LU, f.pivots = _decode(d['LU'], buffers), buffers[d['pivots']]
+        return f
+    if kind == 'qr':
+        f = QRFactorization.__new__(QRFactorization)
+        f.R = _decode(d['R'], buffers)
+        n, W, start = len(f.R), buffers[d['W']], 0
+        f.W = []
+        for k, stored in enumerate(d['reflections']):
+            f.W.append(W[start:start + n - k] if stored else None)
+            start += n - k if stored else 0
+        return f
+    raise ValueError(f'unknown kind of stored object {kind!r}')
+
+
+def dump(obj, f: BinaryIO) -> int:
+    '''
+    Writes the object to a binary file
+
+    params
+    ------
+    obj: Matrix | Vector | Permutation | SparseMatrix | BandedMatrix | (A, b) |
+         LUFactorization | QRFactorization | CholeskyFactorization | BandedLUFactorization
+        object to write, a pair (matrix, vector) is written as a system
+    f: BinaryIO
+        file opened for binary writing (e.g. `sys.stdout.buffer`)
+
+    returns number of written bytes
+    '''
+    arrays: Dict[str, Tuple[str, object]] = {}
+    description = _encode(obj, '', arrays)
+    layout = {}
+    offset = 0
+    for name, (typecode, buf) in arrays.items():
+        layout[name] = [typecode, offset, len(buf)]
+        offset += len(buf) * 8
+        offset += _pad(offset)
+    text = json.dumps({'version': 1, 'object': description, 'arrays': layout, 'dataSize': offset}).encode()
+    text += b' ' * _pad(12 + len(text))
+    f.write(MAGIC)
+    f.write(len(text).to_bytes(4, 'little'))
+    f.write(text)
+    for typecode, buf in arrays.values():
+        data = _littleEndian(buf, typecode)
+        f.write(data)
+        f.write(b'\0' * _pad(len(data)))
+    return 12 + len(text) + offset
+
+def save(path: str, obj):
+    '''
+    Writes the object to the file, `.npy` files are written in the NumPy format (see `dump` and `saveNpy`)
+    '''
+    if str(path).endswith('.npy'):
+        return saveNpy(path, obj)
+    with open(path, 'wb') as f:
+        dump(obj, f)
+
+def recordSize(buf: Buffer) -> Optional[int]:
+    '''
+    Length of the record starting the buffer if its header is complete (at least 12 bytes are needed), None otherwise
+    '''
+    buf = memoryview(buf)
+    if len(buf) < 12:
+        return None
+    if bytes(buf[:8]) != MAGIC:
+        raise ValueError('not a linear system file')
+    length = int.from_bytes(buf[8:12], 'little')
+    if len(buf) < 12 + length:
+        return None
+    return 12 + length + json.loads(bytes(buf[12:12 + length]))['dataSize']
+
+def parse(buf: Buffer):
+    '''
+    Object stored in the buffer (bytes, bytearray, memoryview, mmap) in this or
+    the `.npy` format. Buffers of the object are views of buf, nothing is copied
+    '''
+    buf = memoryview(buf)
+    if bytes(buf[:6]) == NPY_MAGIC:
+        return _parseNpy(buf)
+    if bytes(buf[:8]) != MAGIC:
+        raise ValueError('not a linear system file')
+    length = int.from_bytes(buf[8:12], 'little')
+    header = json.loads(bytes(buf[12:12 + length]))
+    if header['version'] != 1:
+        raise ValueError(f"unsupported version {header['version']}")
+    start = 12 + length
+    buffers = {name: _view(buf, typecode, start + offset, n) for name, (typecode, offset, n) in header['arrays'].items()}
+    return _decode(header['object'], buffers)
+
+def read(f: BinaryIO):
+    '''
+    Reads the next record from a binary stream (e.g. `sys.stdin.buffer`), only
+    the bytes of this record are read
+
+    returns the stored object, None at the end of the stream
+    '''
+    head = f.read(12)
+    if not head:
+        return None
+    if len(head) < 12 or head[:8] != MAGIC:
+        raise ValueError('not a linear system record')
+    length = int.from_bytes(head[8:12], 'little')
+    text = f.read(length)
+    size = 12 + length + json.loads(text)['dataSize']
+    buf = bytearray(size)
+    buf[:12], buf[12:12 + length] = head, text
+    view = memoryview(buf)
+    got = 12 + length
+    while got < size:
+        n = f.readinto(view[got:])
+        if not n:
+            raise EOFError('record is truncated')
+        got += n
+    return parse(buf)
+
+def load(path: str, mode: str = 'r'):
+    '''
+    Maps the file into memory and returns the stored object, its buffers are views of the mapping
+
+    params
+    ------
+    path: str
+        file in this or the `.npy` format
+    mode: str
+        'r' - read only, 'r+' - changes are written to the file, 'c' - copy on write (changes are kept in memory)
+
+    The object reads the file itself, so the file must not be rewritten while the object is used
+    '''
+    access = {'r': mmap.ACCESS_READ, 'r+': mmap.ACCESS_WRITE, 'c': mmap.ACCESS_COPY}[mode]
+    with open(path, 'r+b' if mode == 'r+' else 'rb') as f:
+        m = mmap.mmap(f.fileno(), 0, access=access)
+    return parse(m)
+
+
+def _parseNpy(buf: memoryview):
+    major = buf[6]
+    if major == 1:
+        length, start = int.from_bytes(buf[8:10], 'little'), 10
+    else:
+        length, start = int.from_bytes(buf[8:12], 'little'), 12
+    header = literal_eval(bytes(buf[start:start + length]).decode('latin1'))
+    descr, shape = header['descr'], tuple(header['shape'])
+    if header['fortran_order'] and len(shape) > 1:
+        raise ValueError('only C-ordered .npy arrays are supported')
+    if descr not in ('<f8', '<i8') or len(shape) not in (1, 2) or len(shape) == 2 and shape[0] != shape[1]:
+        raise ValueError(f'only float64 vectors and square matrices (int64 permutations) are supported, got {descr} {shape}')
+    n = shape[0]
+    size = n * n if len(shape) == 2 else n
+    typecode = 'd' if descr == '<f8' else 'q'
+    data = _view(buf, typecode, start + length, size)
+    if typecode == 'q':
+        if len(shape) != 1:
+            raise ValueError('int64 arrays are loaded only as permutations')
+        P = Permutation.__new__(Permutation)
+        P.perm = data
+        return P
+    return Matrix.fromBuffer(data, n) if len(shape) == 2 else Vector.fromBuffer(data)
+
+def saveNpy(path: str, obj: Union[Matrix, Vector, Permutation]):
+    '''
+    Writes the matrix (vector, permutation) in the NumPy `.npy` format version 1.0
+    '''
+    if isinstance(obj, Matrix):
+        descr, shape, typecode, data = '<f8', (len(obj), len(obj)), 'd', obj.data
+    elif isinstance(obj, Vector):
+        descr, shape, typecode, data = '<f8', (len(obj),), 'd', obj.body
+    elif isinstance(obj, Permutation):
+        descr, shape, typecode, data = '<i8', (len(obj),), 'q', obj.perm
+    else:
+        raise TypeError(f'can not store {type(obj).__name__} in .npy')
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {shape}, }}"
+    header += ' ' * _pad(10 + len(header) + 1) + '\n'
+    with open(path, 'wb') as f:
+        f.write(NPY_MAGIC + b'\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1'))
+        f.write(_littleEndian(data, typecode))
@@ -1,31 +1,78 @@
-from typing import Callable, List
+from abc import ABC, abstractmethod
+from array import array
+from functools import wraps
+from operator import mul
+from typing import Callable, Iterable, List, Union
 
 from .vector import Vector
-from .matrix import Matrix, getP
+from .matrix import Matrix, ShapeException, getP
+from .stats import count, phase, timed
 
 def permutation(f: Callable[[Matrix, List[float]], Vector]):
     '''
-    A decorator that multiplies the original matrix 
-    and the free vector by the transformation matrix 
-    to avoid zeros on the diagonal of the matrix of the 
-    system. The solution of the new system coincides 
+    A decorator that reorders rows of the original matrix
+    and the free vector by the permutation from `getP`
+    to avoid zeros on the diagonal of the matrix of the
+    system. The solution of the new system coincides
     with the solution of the original one
     '''
-    def solution(A: Matrix, b: List[float], eps: float = 0):
-        P = getP(A)
-        b = Vector.fromIterable(b)
+    @wraps(f)
+    def solution(A: Matrix, b: List[float], eps: float = 0, **kwargs):
+        with phase('permutation'):
+            P = getP(A)
+            A, b = P*A, P * Vector.fromIterable(b)
         if eps:
-            x = f(P*A, P * b, eps)
+            x = f(A, b, eps, **kwargs)
         else:
-            x = f(P*A, P * b)
+            x = f(A, b, **kwargs)
         return x
     return solution
 
 
+class Factorization(ABC):
+    '''
+    Base class of a decomposed system matrix. The decomposition
+    is computed once in the constructor, subclasses implement
+    `solve` for one free vector and `__len__`
+    '''
+    @abstractmethod
+    def solve(self, b: Union[Vector, List[float]]) -> Vector:
+        '''
+        Returns the solution of the system with the free vector b
+        '''
+
+    @abstractmethod
+    def __len__(self) -> int:
+        '''
+        Returns the size of the system
+        '''
+
+    def solveMany(self, B: Union[Matrix, Iterable[Vector]]):
+        '''
+        Solves the system for several free vectors at once
+
+        params
+        ------
+        B: Matrix | Iterable[Vector]
+            matrix whose columns are free vectors or an iterable of free vectors
 
-def BotDiagSolve(A: Matrix, b: List[float]):
+        returns matrix X such that `A*X = B` if B is a matrix, otherwise list of solution vectors
+        '''
+        if not isinstance(B, Matrix):
+            return [self.solve(b) for b in B]
+        n = len(B)
+        assert len(self) == n, ShapeException(len(self), n)
+        X = array('d')
+        for j in range(n):
+            X.extend(self.solve(B[:, j]).body)
+        return Matrix.fromBuffer(X, n).T
+
+
+@timed('triangular solve')
+def BotDiagSolve(A: Matrix, b: List[float], unit: bool = False):
     '''
     Solution of a system with a lower diagonal matrix by the Gauss method.
+    Elements above the diagonal are not read
 
     params
     ------
@@ -33,6 +80,8 @@ def BotDiagSolve(A: Matrix, b: List[float]):
         Matrix of linear system
     b: Vector | List[float]
         free vector of system
+    unit: bool
+        the diagonal is assumed to be of ones and is not read either
     
     returns the solution vector
     '''
@@ -40,15 +89,17 @@ def BotDiagSolve(A: Matrix, b: List[float]):
     n = len(A)
     x = Vector(n)
     for i in range(n):
-        bi = b[i]
-        for j in range(0,i):
-            bi -= A[i, j] * x[j]
-        x[i] = bi/A[i, i]
+        row = A.row(i)
+        bi = b[i] - sum(map(mul, row[:i], x.body[:i]))
+        x[i] = bi if unit else bi/row[i]
+    count('flops', n * n)
     return x
 
+@timed('triangular solve')
 def TopDiagSolve(A: Matrix, b: List[float]):
     '''
     Solution of a system with a top diagonal matrix by the Gauss method.
+    Elements below the diagonal are not read
 
     params
     ------
@@ -63,8 +114,45 @@ def TopDiagSolve(A: Matrix, b: List[float]):
     n = len(A)
     x = Vector(n)
     for i in range(n-1, -1, -1):
-        bi = b[i]
-        for j in range(i+1, n):
-            bi -= A[i, j] * x[j]
-        x[i] = bi/A[i, i]
-    return x
\ No newline at end of file
+        row = A.row(i)
+        bi = b[i] - sum(map(mul, row[i+1:], x.body[i+1:]))
+        x[i] = bi/row[i]
+    count('flops', n * n)
+    return x
+
+
+def ThomasSolve(sub: List[float], diag: List[float], sup: List[float], b: List[float]):
+    '''
+    Solution of a system with a tridiagonal matrix by the Thomas algorithm
+    (the Gauss method without pivoting) in O(n).
+    Learn more -> https://en.wikipedia.org/wiki/Tridiagonal_matrix_algorithm
+
+    params
+    ------
+    sub: List[float]
+        subdiagonal, `n-1` elements: `sub[i] = a_(i+1)i`
+    diag: List[float]
+        main diagonal, n elements
+    sup: List[float]
+        superdiagonal, `n-1` elements: `sup[i] = a_i(i+1)`
+    b: Vector | List[float]
+        free vector of system
+
+    raises `ZeroDivisionError` if a zero pivot is met (never for diagonally dominant matrices)
+
+    returns the solution vector
+    '''
+    n = len(diag)
+    assert len(b) == n and len(sub) == len(sup) == max(n - 1, 0)
+    c = array('d', [0.]) * n
+    x = array('d', b)
+    c[0] = sup[0] / diag[0] if n > 1 else 0.
+    x[0] /= diag[0]
+    for i in range(1, n):
+        m = diag[i] - sub[i-1] * c[i-1]
+        if i < n - 1:
+            c[i] = sup[i] / m
+        x[i] = (x[i] - sub[i-1] * x[i-1]) / m
+    for i in range(n - 2, -1, -1):
+        x[i] -= c[i] * x[i+1]
+    return Vector.fromBuffer(x)
@@ -5,12 +5,18 @@ Vector
 Implementation of a vector class with the methods necessary to solve a system of linear equations in these ways
 '''
 
-from typing import Iterable, Union, overload
+from array import array
+from typing import Iterable, Optional, Union, overload
+
+from .backend import getBackend
 
 class Vector:
     '''
-    A class encapsulating an array of constant length and mathematical operations on it
+    A class encapsulating an array of constant length and mathematical operations on it.
+    Components are stored in a contiguous `array('d')` buffer
     '''
+    __slots__ = ('body', 'len')
+
     def __init__(self, n: int):
         '''
         params
@@ -18,9 +24,9 @@ class Vector:
         n: int
             length of vector
         '''
-        self.body = [0.] * n
+        self.body = array('d', [0.]) * n
         self.len = n
-    
+
     @staticmethod
     def fromIterable(i: Iterable[float]):
         '''
@@ -31,50 +37,122 @@ class Vector:
         i: Iterable[flaot]
             iterable object
         '''
-        body = list(i)
-        l = len(body)
-        array = Vector(l)
-        array.body = body
-        return array
+        if isinstance(i, Vector):
+            i = i.body
+        return Vector.fromBuffer(array('d', i))
+
+    @staticmethod
+    def fromBuffer(body: array):
+        '''
+        Wraps an existing buffer of doubles into a vector without copying it
+
+        params
+        ------
+        body: array('d') | memoryview
+            buffer of vector components (e.g. a memory-mapped file, see `methods/storage.py`)
+        '''
+        v = Vector.__new__(Vector)
+        v.body = body
+        v.len = len(body)
+        return v
+
+    def _store(self, kernel, *args, out: Optional['Vector'] = None) -> 'Vector':
+        '''
+        Calls the backend kernel with the buffers `args`, the result is put
+        into `out` (a new vector if it is None)
+        '''
+        if out is None:
+            return Vector.fromBuffer(kernel(*args))
+        assert len(out) == self.len, f'can not write {self.len} elements to {len(out)}'
+        return out._write(kernel, *args)
+
+    def _write(self, kernel, *args) -> 'Vector':
+        kernel(*args, out=self.body)
+        return self
+
+    def add(self, other: 'Vector', out: Optional['Vector'] = None) -> 'Vector':
+        '''
+        Piecemeal sum of vectors written into `out` (a new vector if it is None)
+        '''
+        return self._store(getBackend().add, self.body, _buffer(other), out=out)
+
+    def sub(self, other: 'Vector', out: Optional['Vector'] = None) -> 'Vector':
+        '''
+        Piecemeal substraction of vectors written into `out` (a new vector if it is None)
+        '''
+        return self._store(getBackend().sub, self.body, _buffer(other), out=out)
+
+    def mul(self, other: Union[float, 'Vector'], out: Optional['Vector'] = None) -> 'Vector':
+        '''
+        Piecemeal multiplication of vectors or multiplication by a number
+        written into `out` (a new vector if it is None)
+        '''
+        if isinstance(other, Vector):
+            return self._store(getBackend().mul, self.body, other.body, out=out)
+        return self._store(getBackend().scale, self.body, other, out=out)
+
+    def div(self, other: float, out: Optional['Vector'] = None) -> 'Vector':
+        '''
+        Division of all components by a number written into `out` (a new vector if it is None)
+        '''
+        return self._store(getBackend().div, self.body, other, out=out)
+
+    def axpy(self, alpha: float, x: 'Vector') -> 'Vector':
+        '''
+        Adds `alpha*x` to the vector in place, returns the vector itself
+        '''
+        assert len(x) == self.len, f'can not add {len(x)} elements to {self.len}'
+        getBackend().axpy(alpha, _buffer(x), self.body)
+        return self
 
     def __add__(self, other: 'Vector'):
         '''
         Piecemeal sum of vetors
         '''
-        return Vector.fromIterable([i + j for i, j in zip(self.body, other)])
-    
+        return self.add(other)
+
     def __sub__(self, other: 'Vector'):
         '''
         Piecemeal substraction of vetors
         '''
-        return Vector.fromIterable([i - j for i, j in zip(self.body, other)])
-    
+        return self.sub(other)
+
 
     def __truediv__(self, other: float) -> 'Vector':
         '''
         Non-integer division of all components of a vector by a number
         '''
-        return Vector.fromIterable([i / other for i in self.body])
+        return self.div(other)
 
     def __mul__(self, other: Union[float, 'Vector']):
         '''
         Piecemeal multiplication of vetors (not matrix multiplication)
         '''
-        if isinstance(other, Vector):
-            return Vector.fromIterable([i * j for i, j in zip(self.body, other)])
-        return Vector.fromIterable([i * other for i in self.body])
+        return self.mul(other)
+
+    def __iadd__(self, other: 'Vector'):
+        return self.add(other, out=self)
+
+    def __isub__(self, other: 'Vector'):
+        return self.sub(other, out=self)
+
+    def __imul__(self, other: Union[float, 'Vector']):
+        return self.mul(other, out=self)
+
+    def __itruediv__(self, other: float):
+        return self.div(other, out=self)
 
     def dot(self, other: 'Vector') -> float:
         '''
         Scalar multiplication of vectors
         '''
-        return sum(self * other) ** 0.5
-    
+        return getBackend().inner(self.body, _buffer(other)) ** 0.5
+
     def abs(self) -> float:
         '''
         Absolute value of vector
         '''
-        return sum([i*i for i in self.body]) ** 0.5
+        return getBackend().sumsq(self.body) ** 0.5
 
     def __iter__(self):
         return self.body.__iter__()
@@ -82,14 +160,14 @@ class Vector:
     @overload
     def __getitem__(self, ind: slice) -> 'Vector': ...
 
-    @overload 
+    @overload
     def __getitem__(self, ind: int) -> float: ...
 
     def __getitem__(self, ind: 'int | slice') -> float:
         if isinstance(ind, slice):
-            return Vector.fromIterable(self.body[ind])
+            return Vector.fromBuffer(self.body[ind])
         return self.body[ind]
-    
+
     def __setitem__(self, ind: int, val: float):
         self.body[ind] = val
 
@@ -97,16 +175,110 @@ class Vector:
         '''
         Copy of vector
         '''
-        return Vector.fromIterable(self.body)
+        return Vector.fromBuffer(array('d', self.body))
 
     def __str__(self):
         return '('+ ', '.join([str(i) for i in self.body]) + ')'
-    
+
+    def __reduce__(self):
+        '''
+        Vectors (views and memory-mapped ones as well) are pickled with a copy of their components
+        '''
+        return Vector.fromBuffer, (array('d', self.body),)
+
     def __len__(self):
-        return len(self.body)
+        return self.len
+
+
+class VectorView(Vector):
+    '''
+    Vector looking at every `stride`'th element of a buffer owned by
+    somebody else (a row or a column of a matrix). Elements are read from
+    and written to the buffer, `copy` makes an independent vector.
+    `body` of a view is a copy of its elements, so arithmetic works as for
+    `Vector`, but changing `body` does not change the view. In-place
+    operations (`+=`, `axpy`, `out=` arguments) write to the buffer
+    '''
+    __slots__ = ('base', 'offset', 'stride')
+
+    def __init__(self, base: array, offset: int, n: int, stride: int = 1):
+        '''
+        params
+        ------
+        base: array('d')
+            buffer with elements
+        offset: int
+            index of the first element in the buffer
+        n: int
+            length of vector
+        stride: int
+            distance between neighboring elements in the buffer
+        '''
+        assert n == 0 or 0 <= offset + (n - 1) * stride < len(base) and offset < len(base)
+        self.base = base
+        self.offset = offset
+        self.len = n
+        self.stride = stride
+
+    def _slice(self) -> slice:
+        '''
+        Slice of the buffer with the elements of the view
+        '''
+        if self.len == 0:
+            return slice(0, 0)
+        stop = self.offset + (self.len - 1) * self.stride + (1 if self.stride > 0 else -1)
+        return slice(self.offset, stop if stop >= 0 else None, self.stride)
+
+    @property
+    def body(self) -> array:
+        return self.base[self._slice()]
+
+    def _index(self, ind: int) -> int:
+        if not -self.len <= ind < self.len:
+            raise IndexError('vector index out of range')
+        return self.offset + (ind % self.len) * self.stride
+
+    def __getitem__(self, ind: 'int | slice'):
+        if isinstance(ind, slice):
+            r = range(self.len)[ind]
+            return VectorView(self.base, self.offset + r.start * self.stride, len(r), r.step * self.stride)
+        return self.base[self._index(ind)]
+
+    def __setitem__(self, ind: 'int | slice', val):
+        if isinstance(ind, slice):
+            view = self[ind]
+            vals = array('d', _buffer(val))
+            assert len(vals) == view.len, f'can not assign {len(vals)} elements to {view.len}'
+            self.base[view._slice()] = vals
+            return
+        self.base[self._index(ind)] = val
+
+    def _write(self, kernel, *args) -> Vector:
+        self[:] = kernel(*args)
+        return self
+
+    def axpy(self, alpha: float, x: Vector) -> Vector:
+        body = self.body
+        assert len(x) == self.len, f'can not add {len(x)} elements to {self.len}'
+        self[:] = getBackend().axpy(alpha, _buffer(x), body)
+        return self
 
+    def copy(self) -> Vector:
+        '''
+        Independent vector with the same elements
+        '''
+        return Vector.fromBuffer(self.body)
+
+
+def _buffer(v: Iterable[float]) -> array:
+    '''
+    Buffer of vector components, lists and other iterables are copied into a new one
+    '''
+    if isinstance(v, Vector):
+        return v.body
+    return array('d', v)
 
 def ort(n: int, e: int):
     v = Vector(n)
     v[e] = 1
-    return v
\ No newline at end of file
+    return v
@@ -1,6 +1,6 @@
 '''
-Script that generats two tables
-===============================
+Script that generats five tables
+================================
 First table columns
 -------------------
 n - number of test
@@ -17,6 +17,25 @@ n - Size of system matrix
 eps - Required error
 e - amount of conditioned
 (another columns determines same)
+
+Third table columns
+-------------------
+Same as the first table for Krylov methods:
+cg - conjugate gradients, gmres - GMRES, bicgstab - BiCGSTAB
+
+Fourth table columns
+--------------------
+Parallel methods on a matrix that is neither diagonally dominant nor
+symmetric positive definite, so they solve the normal equations, and on a
+dense symmetric positive definite matrix that is not diagonally dominant
+(1 on the diagonal, 0.9 elsewhere), so they are damped:
+jacobi - `JacobiSolve`, redblack - `RedBlackSeidelSolve` (x_hat is found by LU)
+
+Fifth table columns
+-------------------
+`SeidelSolve` with preconditioners on a sparse matrix that needs the normal equations:
+preconditioner - its name, a `Preconditioner` built for the matrix or a function
+x, delta, k - solution, its absolute error and number of iterations
 '''
 
 from prettytable import PrettyTable
@@ -24,8 +43,24 @@ from methods.LU import SolveLU
 from methods.QR import QRSolve
 from methods.Seildel import SeidelSolve
 from methods.FixedPointIteration import IterationSolve
+from methods.Krylov import BiCGSTABSolve, CGSolve, GMRESSolve
+from methods.convergence import ConvergenceException
+from methods.matrix import Matrix
+from methods.parallel import JacobiSolve, RedBlackSeidelSolve
+from methods.preconditioner import JacobiPreconditioner, SSORPreconditioner
+from methods.sparse import SparseMatrix
 from testMatrix import generateTest5, tests
 
+def iterate(method, A, b, eps):
+    '''
+    Runs an iterative method, a failed run gives its last
+    approximation and the reason of failure next to the iterations number
+    '''
+    try:
+        return method(A, b, eps)
+    except ConvergenceException as e:
+        return e.x, f'{e.k} ({e.status})'
+
 columns1 = ['n', 'x_hat', 'eps', 'sim_x', 'sim_delta', 'sim_k', 'seidel_x', 'seidel_delta', 'seidel_k', 'LU_x', 'LU_delta', 'QR_x', 'QR_delta']
 table1 = PrettyTable(columns1)
 for n, test in enumerate(tests):
@@ -36,9 +71,9 @@ for n, test in enumerate(tests):
     qr_delta = (x - qr_x).abs()
     for p in range(3,7):
         eps = 10**(-p)
-        sx, sk = IterationSolve(test.A, test.b, eps)
+        sx, sk = iterate(IterationSolve, test.A, test.b, eps)
         sd = (x - sx).abs()
-        zx, zk = SeidelSolve(test.A, test.b, eps)
+        zx, zk = iterate(SeidelSolve, test.A, test.b, eps)
         zd = (x - zx).abs()
         table1.add_row([n, test.x, eps, sx, sd, sk, zx, zd, zk, lu_x, lu_delta, qr_x, qr_delta])
 print(table1)
@@ -56,10 +91,55 @@ for n in range(4, 10):
         QR_x = QRSolve(tst.A, tst.b)
         QR_delta = (x_hat - QR_x).abs()
         for e in (1e-3, 1e-4, 1e-5, 1e-6):
-            sim_x, sim_k = IterationSolve(tst.A, tst.b, e)
+            sim_x, sim_k = iterate(IterationSolve, tst.A, tst.b, e)
             sim_delta = (x_hat - sim_x).abs()
-            zeydel_x, zeydel_k = SeidelSolve(tst.A, tst.b, e)
+            zeydel_x, zeydel_k = iterate(SeidelSolve, tst.A, tst.b, e)
             zeydel_delta = (x_hat - zeydel_x).abs()
         table2.add_row([n, eps, x_hat, e, sim_x, sim_delta, sim_k, zeydel_x, zeydel_delta, zeydel_k, LU_x, LU_delta, QR_x, QR_delta])
 print(table2)
+print()
+
+columns3 = ['n', 'x_hat', 'eps', 'cg_x', 'cg_delta', 'cg_k', 'gmres_x', 'gmres_delta', 'gmres_k', 'bicgstab_x', 'bicgstab_delta', 'bicgstab_k']
+table3 = PrettyTable(columns3)
+for n, test in enumerate(tests):
+    x = test.x
+    for p in range(3,7):
+        eps = 10**(-p)
+        row = [n, x, eps]
+        for method in (CGSolve, GMRESSolve, BiCGSTABSolve):
+            kx, kk = iterate(method, test.A, test.b, eps)
+            row += [kx, (x - kx).abs(), kk]
+        table3.add_row(row)
+print(table3)
+print()
+
+columns4 = ['n', 'x_hat', 'eps', 'jacobi_x', 'jacobi_delta', 'jacobi_k', 'redblack_x', 'redblack_delta', 'redblack_k']
+table4 = PrettyTable(columns4)
+systems = [(Matrix([[1, 2, 0], [3, 1, 1], [0, 1, 4]]), [1, 2, 3]),
+           (Matrix([[1 if i == j else 0.9 for j in range(10)] for i in range(10)]), list(range(1, 11)))]
+for A, b in systems:
+    x = SolveLU(A, b)
+    for p in range(3, 9):
+        eps = 10**(-p)
+        row = [len(A), x, eps]
+        for method in (JacobiSolve, RedBlackSeidelSolve):
+            px, pk = iterate(lambda A, b, eps: method(A, b, eps, workers=2), A, b, eps)
+            row += [px, (x - px).abs(), pk]
+        table4.add_row(row)
+print(table4)
+print()
 
+columns5 = ['n', 'x_hat', 'eps', 'preconditioner', 'x', 'delta', 'k']
+table5 = PrettyTable(columns5)
+A = Matrix([[4, 1, 0, 0], [5, 2, 1, 0], [0, 1, 3, 1], [0, 0, 2, 1]])
+b = [1, 2, 3, 4]
+x = SolveLU(A, b)
+S = SparseMatrix.fromDense(A)
+jacobi = JacobiPreconditioner(S)
+preconditioners = {'ssor': 'ssor', 'SSORPreconditioner': SSORPreconditioner(S), 'function': lambda r: jacobi(r)}
+for p in range(6, 11, 2):
+    eps = 10**(-p)
+    for name, preconditioner in preconditioners.items():
+        px, pk = iterate(lambda A, b, eps: SeidelSolve(A, b, eps, preconditioner=preconditioner), S, b, eps)
+        table5.add_row([4, x, eps, name, px, (x - px).abs(), pk])
+print(table5)